@@ -1,7 +1,109 @@
-import requests
+import http.client
+import json
+import queue
+import socket
+from urllib.parse import urlsplit
 
 BRIDGE_URL = "http://127.0.0.1:8766/command"
 
+# Si http_bridge también escucha en un Unix socket (HTTP_UDS_PATH), poner
+# la misma ruta acá para ir por ahí en vez de TCP.
+BRIDGE_UDS_PATH = None
+BRIDGE_TIMEOUT = 3
+BRIDGE_POOL_SIZE = 4
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self._path)
+        self.sock = sock
+
+
+class BridgeClient:
+    """
+    Cliente keep-alive del http_bridge: un pool chico de conexiones HTTP/1.1
+    persistentes (TCP o Unix socket), seguro entre hilos. Una ráfaga de
+    comandos (volumen, seek...) no abre una conexión por comando.
+    """
+
+    def __init__(self, url: str = BRIDGE_URL, *, uds_path: str = BRIDGE_UDS_PATH,
+                 pool_size: int = BRIDGE_POOL_SIZE, timeout: float = BRIDGE_TIMEOUT):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.path = parts.path or "/"
+        self.uds_path = uds_path
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+
+    def _new_conn(self) -> http.client.HTTPConnection:
+        if self.uds_path:
+            return _UnixHTTPConnection(self.uds_path, self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _acquire(self) -> http.client.HTTPConnection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._new_conn()
+
+    def _release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def post(self, payload: dict) -> tuple:
+        """(status, dict de respuesta). Reintenta una vez si el keep-alive estaba muerto."""
+        body = json.dumps(payload).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        conn = self._acquire()
+        while True:
+            reused = conn.sock is not None
+            try:
+                conn.request("POST", self.path, body, headers)
+                resp = conn.getresponse()
+                data = resp.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if not reused:
+                    raise
+                # el bridge cerró la conexión ociosa: una vez más con una nueva
+            except Exception:
+                conn.close()
+                raise
+
+        if resp.will_close:
+            conn.close()
+        self._release(conn)
+        try:
+            return resp.status, json.loads(data or b"{}")
+        except ValueError:
+            return resp.status, {}
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_client = None
+
+def get_client() -> BridgeClient:
+    global _client
+    if _client is None:
+        _client = BridgeClient()
+    return _client
+
 def youtube_control(data: dict) -> str:
     """
     Envía comandos de control de YouTube al bridge local,
@@ -20,13 +122,10 @@ def youtube_control(data: dict) -> str:
     }
 
     try:
-        response = requests.post(
-            BRIDGE_URL,
-            json=payload,
-            timeout=3
-        )
-        response.raise_for_status()
-    except requests.exceptions.RequestException as e:
+        status, reply = get_client().post(payload)
+    except (OSError, http.client.HTTPException) as e:
         raise RuntimeError(f"Error comunicándose con el bridge: {e}")
+    if status >= 400:
+        raise RuntimeError(f"Error comunicándose con el bridge: {status} {reply.get('error', '')}".strip())
 
     return f"YouTube: comando '{command}' enviado correctamente"
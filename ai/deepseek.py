@@ -1,23 +1,249 @@
+import json
+import threading
+import time
+import weakref
+
 import requests
+from requests.adapters import HTTPAdapter
 from config import DEEPSEEK_API_KEY, MODEL_NAME, MAX_TOKENS, TEMPERATURE
 
+try:
+    import httpx  # opcional: solo para http2=True (pip install httpx[http2])
+except ImportError:
+    httpx = None
+
 API_URL = "https://api.deepseek.com/chat/completions"
 
+def _headers():
+    return {
+        "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
+        "Content-Type": "application/json"
+    }
+
+def _body(messages, stream=False):
+    body = {
+        "model": MODEL_NAME,
+        "messages": messages,
+        "max_tokens": MAX_TOKENS,
+        "temperature": TEMPERATURE
+    }
+    if stream:
+        body["stream"] = True
+    return body
+
+def iter_sse_deltas(lines):
+    """
+    Convierte líneas SSE ("data: {...}") en fragmentos de texto del modelo.
+    Termina con "data: [DONE]". Ignora comentarios / keep-alives.
+    """
+    for line in lines:
+        if not line:
+            continue
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+        if not line.startswith("data:"):
+            continue
+
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+
+        try:
+            chunk = json.loads(data)
+        except json.JSONDecodeError:
+            continue
+
+        for choice in chunk.get("choices") or []:
+            delta = (choice.get("delta") or {}).get("content")
+            if delta:
+                yield delta
+
+
+class DeepSeekClient:
+    """
+    Cliente HTTP reutilizable: pool keep-alive (requests.Session) o
+    HTTP/2 con httpx. Guarda en last_stats si la conexión se reutilizó
+    (mismo socket que ya atendió otro request) y el TTFB (tiempo hasta
+    cabeceras) de cada request.
+    """
+
+    def __init__(self, api_url: str = API_URL, *, http2: bool = False,
+                 pool_size: int = 4, timeout: float = 30, verify=True):
+        self.api_url = api_url
+        self.timeout = timeout
+        self.http2 = http2
+        self.verify = verify
+
+        self.last_stats = {}
+        self.totals = {"requests": 0, "reused": 0, "new_connections": 0}
+        self._warm_thread = None
+        self._seen_socks = weakref.WeakSet()    # sockets que ya atendieron un request
+
+        if http2:
+            if httpx is None:
+                raise RuntimeError("http2=True requiere httpx (pip install httpx[http2])")
+            self._http = httpx.Client(
+                http2=True,
+                verify=verify,
+                timeout=timeout,
+                limits=httpx.Limits(max_keepalive_connections=pool_size),
+            )
+        else:
+            self._http = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            self._http.mount("https://", adapter)
+            self._http.mount("http://", adapter)
+
+    # --- API ---
+    def warm_up(self, background: bool = True):
+        """Abre la primera conexión (DNS + TCP + TLS) antes del primer turno."""
+        if background:
+            if self._warm_thread is None or not self._warm_thread.is_alive():
+                self._warm_thread = threading.Thread(target=self._warm, daemon=True)
+                self._warm_thread.start()
+            return
+        self._warm()
+
+    def ask(self, messages) -> str:
+        with self._post(_body(messages)) as response:
+            data = response.json()
+        self._finish_stats()
+        return data["choices"][0]["message"]["content"]
+
+    def ask_stream(self, messages):
+        with self._post(_body(messages, stream=True), stream=True) as response:
+            lines = response.iter_lines()
+            yield from iter_sse_deltas(lines)
+            # Leer hasta el final (chunk 0 del chunked) antes de cerrar: si no,
+            # urllib3 tira el socket y el siguiente turno paga otro handshake TLS
+            for _ in lines:
+                pass
+        self._finish_stats()
+
+    def close(self):
+        self._http.close()
+
+    # --- internals ---
+    def _warm(self):
+        try:
+            # Cualquier respuesta sirve: lo que importa es dejar el socket en el pool
+            if self.http2:
+                self._http.head(self.api_url)
+            else:
+                response = self._http.head(self.api_url, timeout=self.timeout,
+                                           verify=self.verify, stream=True)
+                self._was_reused(response)
+                response.content    # leída entera: el socket vuelve al pool
+                response.close()
+        except Exception:
+            pass
+
+    def _was_reused(self, response):
+        """
+        True si el socket de esta respuesta ya había atendido otro request.
+        urllib3 reconecta dentro del mismo slot del pool, así que se mira el
+        socket y no cuántas conexiones tiene el pool. None con httpx.
+        """
+        if self.http2:
+            return None
+        raw = getattr(response, "raw", None)
+        conn = getattr(raw, "connection", None) or getattr(raw, "_connection", None)
+        sock = getattr(conn, "sock", None)
+        if sock is None:
+            # Con "Connection: close" http.client ya soltó conn.sock; el
+            # socket sigue detrás del archivo que lee la respuesta
+            fp = getattr(getattr(raw, "_fp", None), "fp", None)
+            sock = getattr(getattr(fp, "raw", None), "_sock", None)
+        if sock is None:
+            return None
+        reused = sock in self._seen_socks
+        self._seen_socks.add(sock)
+        return reused
+
+    def _post(self, body, stream=False):
+        t0 = time.perf_counter()
+
+        if self.http2:
+            request = self._http.build_request("POST", self.api_url, headers=_headers(), json=body)
+            response = self._http.send(request, stream=True)
+            http_version = response.http_version
+        else:
+            response = self._http.post(
+                self.api_url,
+                headers=_headers(),
+                json=body,
+                timeout=self.timeout,
+                verify=self.verify,
+                stream=True
+            )
+            http_version = "HTTP/1.1"
+
+        ttfb = time.perf_counter() - t0
+        reused = self._was_reused(response)
+
+        self.last_stats = {
+            "reused": reused,
+            "ttfb_ms": round(ttfb * 1000, 2),
+            "total_ms": None,
+            "http_version": http_version,
+            "_t0": t0,
+        }
+        self.totals["requests"] += 1
+        if reused is True:
+            self.totals["reused"] += 1
+        elif reused is False:
+            self.totals["new_connections"] += 1
+
+        try:
+            response.raise_for_status()
+        except Exception:
+            response.close()
+            raise
+
+        if not self.http2:
+            return response
+        return _Httpx(response)
+
+    def _finish_stats(self):
+        t0 = self.last_stats.pop("_t0", None)
+        if t0 is not None:
+            self.last_stats["total_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+
+
+class _Httpx:
+    """Adapta httpx.Response a la interfaz que usa DeepSeekClient (json/iter_lines/with)."""
+
+    def __init__(self, response):
+        self._r = response
+
+    def json(self):
+        self._r.read()
+        return self._r.json()
+
+    def iter_lines(self):
+        return self._r.iter_lines()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._r.close()
+
+
+_client = None
+
+def get_client() -> DeepSeekClient:
+    global _client
+    if _client is None:
+        _client = DeepSeekClient()
+    return _client
+
 def ask_deepseek(messages):
-    response = requests.post(
-        API_URL,
-        headers={
-            "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-            "Content-Type": "application/json"
-        },
-        json={
-            "model": MODEL_NAME,
-            "messages": messages,
-            "max_tokens": MAX_TOKENS,
-            "temperature": TEMPERATURE
-        },
-        timeout=30
-    )
-
-    response.raise_for_status()
-    return response.json()["choices"][0]["message"]["content"]
+    return get_client().ask(messages)
+
+def ask_deepseek_stream(messages):
+    """
+    Igual que ask_deepseek(), pero con stream=True: va devolviendo
+    (yield) los fragmentos de texto conforme el modelo los genera.
+    """
+    yield from get_client().ask_stream(messages)
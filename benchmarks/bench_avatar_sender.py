@@ -0,0 +1,114 @@
+"""
+Benchmark: sender de AvatarWSClient, polling (get_nowait + sleep 10 ms)
+contra el actual (carriles deque por tipo + asyncio.Event que despierta al
+sender vía call_soon_threadsafe).
+
+Levanta un hub mínimo local que anota cuándo llega cada mensaje y mide:
+  - CPU del proceso con el cliente conectado y sin nada que mandar
+  - latencia encolar -> recibido en el socket (p50 / p95 / max)
+
+Uso:  python benchmarks/bench_avatar_sender.py [SEGUNDOS_IDLE] [N_MENSAJES]
+"""
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from queue import Empty, Queue
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import websockets
+
+from jarvis_avatar_web.server.avatar_ws_client import AvatarWSClient
+
+PORT = 8790
+
+
+class PollingClient(AvatarWSClient):
+    """El sender de antes: Queue de hilos + sondeo cada 10 ms."""
+
+    def __init__(self, url):
+        super().__init__(url)
+        self._legacy = Queue()
+
+    def _put(self, msg, mtype=None, ttl=None, bulk=False):
+        self._legacy.put(msg)
+
+    async def _sender_loop(self, ws):
+        while not self._stop.is_set():
+            try:
+                msg = self._legacy.get_nowait()
+            except Empty:
+                await asyncio.sleep(0.01)
+                continue
+            await ws.send(json.dumps(msg, ensure_ascii=False))
+
+
+class Hub:
+    def __init__(self):
+        self.latencies = []
+        self.received = threading.Event()
+        self.expected = 0
+        self.ready = threading.Event()
+
+    async def handle(self, ws):
+        async for raw in ws:
+            now = time.perf_counter()
+            msg = json.loads(raw)
+            if msg.get("type") == "say":
+                self.latencies.append((now - msg["t"]) * 1000)
+                if len(self.latencies) >= self.expected:
+                    self.received.set()
+
+    async def serve(self):
+        async with websockets.serve(self.handle, "127.0.0.1", PORT):
+            self.ready.set()
+            await asyncio.Future()
+
+    def start(self):
+        threading.Thread(target=lambda: asyncio.run(self.serve()), daemon=True).start()
+        self.ready.wait()
+
+
+def run(name, client_cls, hub, idle_s, n):
+    client = client_cls(f"ws://127.0.0.1:{PORT}")
+    client.start()
+    while not client.status()["connected"]:
+        time.sleep(0.01)
+    time.sleep(0.2)
+
+    t0 = time.process_time()
+    time.sleep(idle_s)
+    idle_cpu = (time.process_time() - t0) / idle_s * 100
+
+    hub.latencies = []
+    hub.expected = n
+    hub.received.clear()
+    for _ in range(n):
+        client._put({"type": "say", "text": "hola", "t": time.perf_counter()}, "say")
+        time.sleep(0.005)
+    hub.received.wait(10)
+    client.stop()
+
+    lat = sorted(hub.latencies)
+    p95 = lat[int(len(lat) * 0.95) - 1]
+    print(f"  {name:<28} idle CPU {idle_cpu:6.2f} %   "
+          f"latencia p50 {statistics.median(lat):6.3f} ms  p95 {p95:6.3f} ms  max {lat[-1]:6.3f} ms")
+    time.sleep(0.3)
+
+
+def main():
+    idle_s = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    hub = Hub()
+    hub.start()
+    print(f"Idle {idle_s:.0f} s, {n} mensajes cada 5 ms")
+    run("polling 10 ms (antes)", PollingClient, hub, idle_s, n)
+    run("carriles + Event (ahora)", AvatarWSClient, hub, idle_s, n)
+
+
+if __name__ == "__main__":
+    main()
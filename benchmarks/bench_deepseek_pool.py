@@ -0,0 +1,135 @@
+"""
+Benchmark: requests.post() por turno vs DeepSeekClient (pool keep-alive).
+
+Levanta un stand-in HTTPS local (cert autofirmado con openssl) que responde
+como /chat/completions, y mide latencia por request de cada modo.
+
+Uso:  python benchmarks/bench_deepseek_pool.py [N]
+"""
+import json
+import os
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+import urllib3
+
+from ai.deepseek import DeepSeekClient
+
+urllib3.disable_warnings()
+
+REPLY = json.dumps({
+    "choices": [{"message": {"content": '{"emotion":"neutral","speech":"ok","action":{"type":"none","data":{}}}'}}]
+}).encode("utf-8")
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", "0"))
+        self.rfile.read(length)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(REPLY)))
+        self.end_headers()
+        self.wfile.write(REPLY)
+
+    def do_HEAD(self):
+        self.send_response(405)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        return
+
+
+def make_cert(tmpdir):
+    cert = os.path.join(tmpdir, "cert.pem")
+    key = os.path.join(tmpdir, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+def start_server(cert, key):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(cert, key)
+    httpd.socket = ctx.wrap_socket(httpd.socket, server_side=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def report(name, samples):
+    ms = [s * 1000 for s in samples]
+    return {
+        "mode": name,
+        "n": len(ms),
+        "mean_ms": round(statistics.mean(ms), 3),
+        "p50_ms": round(pct(ms, 0.50), 3),
+        "p95_ms": round(pct(ms, 0.95), 3),
+    }
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    messages = [{"role": "user", "content": "hola"}]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cert, key = make_cert(tmpdir)
+        httpd = start_server(cert, key)
+        url = f"https://127.0.0.1:{httpd.server_address[1]}/chat/completions"
+
+        # 1) como antes: requests.post sin Session (handshake TLS por turno)
+        cold = []
+        for _ in range(n):
+            t0 = time.perf_counter()
+            r = requests.post(url, json={"messages": messages}, timeout=30, verify=False)
+            r.raise_for_status()
+            r.json()["choices"][0]["message"]["content"]
+            cold.append(time.perf_counter() - t0)
+
+        # 2) DeepSeekClient con pool + warm-up
+        client = DeepSeekClient(url, verify=False)
+        client.warm_up(background=False)
+        pooled = []
+        ttfb = []
+        for _ in range(n):
+            t0 = time.perf_counter()
+            client.ask(messages)
+            pooled.append(time.perf_counter() - t0)
+            ttfb.append(client.last_stats["ttfb_ms"])
+        client.close()
+
+        httpd.shutdown()
+
+    result = {
+        "requests_post": report("requests.post", cold),
+        "pooled_client": report("DeepSeekClient", pooled),
+        "pooled_ttfb_p50_ms": round(pct(ttfb, 0.5), 3),
+        "pooled_totals": client.totals,
+    }
+    result["speedup_mean"] = round(result["requests_post"]["mean_ms"] / result["pooled_client"]["mean_ms"], 2)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark: CPU del hub por MB reenviado.
+
+Compara el camino viejo (json.loads del frame entero + dumps de vuelta por
+broadcast) con el actual: peek_envelope / decode_header y, como hace relay(),
+troceo en pedazos ya numerados si el frame llegó entero, o "seq" empalmado
+en el header si ya viene troceado. Mide solo el trabajo del hub por frame,
+sin sockets.
+
+Uso:  python benchmarks/bench_hub_forward.py [MB_POR_CASO]
+"""
+import base64
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jarvis_avatar_web.server.framing import (
+    FRAME_CHUNK_BYTES, decode_header, encode_binary, peek_envelope, split_frame, stamp_seq,
+)
+from jarvis_avatar_web.server.ws_server import STATEFUL_TYPES
+
+AUDIO_BYTES = 160_000       # ~5 s de PCM 16 kHz mono
+VISEMES = [{"t": i * 40, "id": i % 22} for i in range(120)]
+
+
+def old_path(raw):
+    msg = json.loads(raw)
+    return json.dumps(msg, ensure_ascii=False)
+
+
+def forward(raw, msg):
+    """Lo mismo que relay(): entero y grande -> pedazos numerados; si no, stamp."""
+    if "frag" not in msg and len(raw) > FRAME_CHUNK_BYTES:
+        return split_frame(raw, "h1", msg.get("type"), first_seq=1)
+    return stamp_seq(raw, 1)
+
+
+def new_text_path(raw):
+    return forward(raw, peek_envelope(raw, STATEFUL_TYPES))
+
+
+def new_binary_path(raw):
+    return forward(raw, decode_header(raw))
+
+
+def run(fn, frame, total_mb):
+    size = len(frame)
+    n = max(1, int(total_mb * 1024 * 1024 // size))
+    t0 = time.process_time()
+    for _ in range(n):
+        fn(frame)
+    cpu = time.process_time() - t0
+    mb = n * size / (1024 * 1024)
+    return cpu * 1000 / mb, n
+
+
+def main():
+    total_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 64
+    audio = os.urandom(AUDIO_BYTES)
+    text_frame = json.dumps({
+        "type": "tts",
+        "emotion": "happy",
+        "audio_b64": base64.b64encode(audio).decode("ascii"),
+        "visemes": VISEMES,
+    }, ensure_ascii=False)
+    bin_frame = encode_binary({"type": "tts", "emotion": "happy", "visemes": VISEMES}, audio)
+    # Pedazo que ya troceó el productor (AvatarWSClient)
+    frag_frame = split_frame(bin_frame, "c1", "tts")[0]
+
+    cases = [
+        ("texto base64, json.loads+dumps (antes)", old_path, text_frame),
+        ("texto base64, peek + troceo (ahora)", new_text_path, text_frame),
+        ("binario entero, troceo (ahora)", new_binary_path, bin_frame),
+        ("binario ya troceado, stamp (ahora)", new_binary_path, frag_frame),
+    ]
+    print(f"Frame texto: {len(text_frame)/1024:.0f} KB | binario: {len(bin_frame)/1024:.0f} KB | {total_mb:.0f} MB por caso")
+    for name, fn, frame in cases:
+        ms_per_mb, n = run(fn, frame, total_mb)
+        print(f"  {name:<42} {ms_per_mb:9.4f} ms CPU/MB  ({n} frames)")
+
+
+if __name__ == "__main__":
+    main()
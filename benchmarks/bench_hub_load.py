@@ -0,0 +1,237 @@
+"""
+Carga del hub (ws_server): N avatares suscritos, M productores de mouse a
+60 Hz y frames de TTS inyectados a ritmo fijo.
+
+Levanta el hub en un subproceso y reporta en JSON:
+  - latencia publicar -> recibir (p50 / p95 / p99) de mouse y de TTS completo
+  - throughput (mensajes y MB por segundo recibidos por los suscriptores)
+  - RSS y CPU del proceso del hub
+
+Uso:
+  python benchmarks/bench_hub_load.py --subscribers 4 --producers 2 \\
+      --tts-rate 1 --tts-bytes 400000 --duration 10 --out load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import websockets
+
+from jarvis_avatar_web.server.framing import decode_binary, decode_header, encode_binary
+
+try:
+    import psutil
+except ImportError:     # sin psutil se lee /proc (Linux)
+    psutil = None
+
+MOUSE_HZ = 60
+HUB_SCRIPT = """
+import asyncio, sys, websockets
+from jarvis_avatar_web.server import ws_server
+
+async def main():
+    async with websockets.serve(ws_server.handle_ws, "127.0.0.1", int(sys.argv[1]), max_size=2**23):
+        await asyncio.Future()
+
+asyncio.run(main())
+"""
+
+
+# -----------------------------
+# Métricas del proceso del hub
+# -----------------------------
+def proc_usage(pid: int) -> tuple:
+    """(segundos de CPU, RSS en bytes) del proceso."""
+    if psutil is not None:
+        p = psutil.Process(pid)
+        t = p.cpu_times()
+        return t.user + t.system, p.memory_info().rss
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    rss = 0
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                rss = int(line.split()[1]) * 1024
+    return cpu, rss
+
+
+def percentiles(samples: list) -> dict:
+    if not samples:
+        return {"n": 0}
+    s = sorted(samples)
+
+    def pct(p):
+        return round(s[min(len(s) - 1, int(len(s) * p))], 3)
+
+    return {"n": len(s), "p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99), "max": round(s[-1], 3)}
+
+
+# -----------------------------
+# Clientes sintéticos
+# -----------------------------
+class Load:
+    def __init__(self, url: str):
+        self.url = url
+        self.stop = asyncio.Event()
+        self.mouse_sent = {}        # x -> instante de publicación
+        self.mouse_ms = []
+        self.tts_ms = []
+        self.msgs = 0
+        self.bytes = 0
+
+    async def subscriber(self):
+        async with websockets.connect(self.url, max_size=2**23) as ws:
+            await ws.send(json.dumps({
+                "type": "hello", "role": "avatar",
+                "subscribe": ["state", "emotion", "mouse", "say", "tts"],
+            }))
+            started = {}    # frag -> t de publicación (header interno)
+            while not self.stop.is_set():
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), 0.2)
+                except asyncio.TimeoutError:
+                    continue
+                now = time.perf_counter()
+                self.msgs += 1
+                self.bytes += len(raw)
+
+                if isinstance(raw, bytes):
+                    header, payload = decode_binary(raw)
+                    if "frag" not in header:
+                        if "t" in header:
+                            self.tts_ms.append((now - header["t"]) * 1000)
+                        continue
+                    if header["i"] == 0:
+                        started[header["frag"]] = decode_header(payload).get("t")
+                    if header["i"] == header["n"] - 1:
+                        t = started.pop(header["frag"], None)
+                        if t is not None:
+                            self.tts_ms.append((now - t) * 1000)
+                    continue
+
+                msg = json.loads(raw)
+                if msg.get("type") == "mouse":
+                    t = self.mouse_sent.get(msg.get("x"))
+                    if t is not None:
+                        self.mouse_ms.append((now - t) * 1000)
+
+    async def mouse_producer(self, k: int, m: int):
+        async with websockets.connect(self.url) as ws:
+            await ws.send(json.dumps({"type": "hello", "role": "producer", "subscribe": []}))
+            i = 0
+            while not self.stop.is_set():
+                i += 1
+                # x único por muestra para poder emparejar lo que llega conflado
+                x = ((i * m + k) % 1_000_000) / 1_000_000
+                self.mouse_sent[x] = time.perf_counter()
+                await ws.send(json.dumps({"type": "mouse", "x": x, "y": k / max(1, m)}))
+                await asyncio.sleep(1.0 / MOUSE_HZ)
+
+    async def tts_producer(self, rate: float, size: int):
+        if rate <= 0:
+            return
+        audio = os.urandom(size)
+        async with websockets.connect(self.url, max_size=2**23) as ws:
+            await ws.send(json.dumps({"type": "hello", "role": "producer", "subscribe": []}))
+            while not self.stop.is_set():
+                await ws.send(encode_binary({"type": "tts", "format": "wav", "t": time.perf_counter()}, audio))
+                await asyncio.sleep(1.0 / rate)
+
+
+async def run(args) -> dict:
+    url = f"ws://127.0.0.1:{args.port}"
+    load = Load(url)
+
+    subs = [asyncio.create_task(load.subscriber()) for _ in range(args.subscribers)]
+    await asyncio.sleep(0.3)
+    prods = [asyncio.create_task(load.mouse_producer(k, args.producers)) for k in range(args.producers)]
+    prods.append(asyncio.create_task(load.tts_producer(args.tts_rate, args.tts_bytes)))
+
+    await asyncio.sleep(1.0)                # calentamiento
+    load.mouse_ms.clear(); load.tts_ms.clear()
+    load.msgs = load.bytes = 0
+    cpu0, _ = proc_usage(args.hub_pid)
+    t0 = time.perf_counter()
+
+    await asyncio.sleep(args.duration)
+
+    elapsed = time.perf_counter() - t0
+    cpu1, rss = proc_usage(args.hub_pid)
+    msgs, nbytes = load.msgs, load.bytes
+    load.stop.set()
+    await asyncio.gather(*subs, *prods, return_exceptions=True)
+
+    return {
+        "config": {
+            "subscribers": args.subscribers,
+            "mouse_producers": args.producers,
+            "mouse_hz": MOUSE_HZ,
+            "tts_rate": args.tts_rate,
+            "tts_bytes": args.tts_bytes,
+            "duration_s": args.duration,
+        },
+        "latency_ms": {
+            "mouse": percentiles(load.mouse_ms),
+            "tts": percentiles(load.tts_ms),
+        },
+        "throughput": {
+            "msgs_per_s": round(msgs / elapsed, 1),
+            "mb_per_s": round(nbytes / elapsed / (1024 * 1024), 3),
+        },
+        "hub": {
+            "rss_mb": round(rss / (1024 * 1024), 1),
+            "cpu_percent": round((cpu1 - cpu0) / elapsed * 100, 1),
+        },
+    }
+
+
+def wait_port(port: int, timeout: float = 10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), 0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"el hub no abrió el puerto {port}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Carga del hub WebSocket del avatar")
+    ap.add_argument("--subscribers", type=int, default=4)
+    ap.add_argument("--producers", type=int, default=2)
+    ap.add_argument("--tts-rate", type=float, default=1.0, help="frames TTS por segundo")
+    ap.add_argument("--tts-bytes", type=int, default=400_000)
+    ap.add_argument("--duration", type=float, default=10.0)
+    ap.add_argument("--port", type=int, default=8780)
+    ap.add_argument("--out", help="archivo JSON (si no, stdout)")
+    args = ap.parse_args()
+
+    hub = subprocess.Popen([sys.executable, "-c", HUB_SCRIPT, str(args.port)], cwd=ROOT)
+    try:
+        wait_port(args.port)
+        args.hub_pid = hub.pid
+        result = asyncio.run(run(args))
+    finally:
+        hub.terminate()
+        hub.wait()
+
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: frames "mouse" mandados por el productor, tick fijo a 60 Hz
+(antes) contra MouseSampler (deadband + ritmo adaptativo + heartbeat).
+
+Reproduce trazas de cursor con reloj simulado (corre al instante y en Linux).
+Sin argumentos usa trazas sintéticas; también acepta trazas grabadas con
+  python -m jarvis_avatar_web.server.mouse_sampler record traza.json
+
+Uso:  python benchmarks/bench_mouse_sampler.py [traza.json ...]
+"""
+import json
+import math
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jarvis_avatar_web.server.mouse_sampler import MouseSampler, TraceSource, rect_normalizer
+
+SCREEN = (0, 0, 1920, 1080)
+FIXED_HZ = 60
+
+
+class SimClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def synthetic_traces(seconds: float = 60.0, hz: float = 120.0) -> dict:
+    rnd = random.Random(7)
+    n = int(seconds * hz)
+    ts = [i / hz for i in range(n)]
+
+    # Quieto todo el rato (el avatar mirando al centro)
+    idle = [(t, 960, 540) for t in ts]
+
+    # Leyendo: quieto con movimientos cortos cada tanto
+    reading, x, y, target = [], 960.0, 540.0, None
+    for t in ts:
+        if target is None and rnd.random() < 0.6 / hz:
+            target = (rnd.uniform(200, 1700), rnd.uniform(150, 900))
+        if target is not None:
+            x += (target[0] - x) * 0.15
+            y += (target[1] - y) * 0.15
+            if abs(target[0] - x) < 1 and abs(target[1] - y) < 1:
+                target = None
+        reading.append((t, round(x), round(y)))
+
+    # Trabajando: movimiento casi continuo
+    busy = [(t, round(960 + 700 * math.sin(t * 0.9) + rnd.uniform(-3, 3)),
+             round(540 + 350 * math.sin(t * 1.7))) for t in ts]
+
+    return {"idle": idle, "reading": reading, "busy": busy}
+
+
+def run_trace(trace) -> dict:
+    clock = SimClock()
+    source = TraceSource(trace, clock)
+    sampler = MouseSampler(source, rect_normalizer(*SCREEN), clock=clock)
+    duration = source.duration()
+    while clock.t < duration:
+        _, delay = sampler.step()
+        clock.t += delay
+    fixed = int(duration * FIXED_HZ)
+    return {
+        "duration_s": round(duration, 1),
+        "fixed_60hz": fixed,
+        "sampler_sent": sampler.sent,
+        "sampler_polls": sampler.samples,
+        "saved_pct": round(100 * (1 - sampler.sent / max(1, fixed)), 1),
+    }
+
+
+def main():
+    traces = synthetic_traces()
+    for path in sys.argv[1:]:
+        with open(path, encoding="utf-8") as f:
+            traces[os.path.basename(path)] = json.load(f)
+
+    print(f"{'traza':<16}{'seg':>6}{'60 Hz':>8}{'sampler':>9}{'lecturas':>10}{'ahorro':>9}")
+    for name, trace in traces.items():
+        r = run_trace(trace)
+        print(f"{name:<16}{r['duration_s']:>6}{r['fixed_60hz']:>8}{r['sampler_sent']:>9}"
+              f"{r['sampler_polls']:>10}{r['saved_pct']:>8}%")
+
+
+if __name__ == "__main__":
+    main()
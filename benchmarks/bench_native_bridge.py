@@ -0,0 +1,142 @@
+"""
+Benchmark: http_bridge -> native_host -> stdout (Chrome), loop viejo
+(recv + json.loads + sleep 50 ms, sin framing) contra bridge_loop
+(selectors + frames con largo).
+
+Un socket local hace de http_bridge y un stdout falso hace de Chrome,
+anotando cuándo llega cada comando. Mide:
+  - latencia de un comando suelto (p50 / p95 / max)
+  - ráfaga de comandos pegados (pipelining): cuántos llegan y en cuánto
+
+Uso:  python benchmarks/bench_native_bridge.py [N_SUELTOS] [N_RAFAGA]
+"""
+import json
+import os
+import socket
+import statistics
+import struct
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "native_bridge"))
+
+from bridge_framing import encode_frame
+from native_host import bridge_loop
+
+
+class FakeStdout:
+    """Lo que Chrome leería: frames Native Messaging; anota la llegada de cada uno."""
+
+    def __init__(self):
+        self.arrivals = {}      # id -> perf_counter
+        self._buf = b""
+
+    def write(self, data: bytes):
+        self._buf += data
+        while len(self._buf) >= 4:
+            (n,) = struct.unpack_from("<I", self._buf)
+            if len(self._buf) < 4 + n:
+                break
+            msg = json.loads(self._buf[4:4 + n])
+            self._buf = self._buf[4 + n:]
+            self.arrivals[msg["id"]] = time.perf_counter()
+
+    def flush(self):
+        pass
+
+
+def legacy_loop(stop_event, out, connect):
+    """El loop de antes: un recv = un JSON, y sleep de 50 ms por vuelta."""
+    sock = None
+    while not stop_event.is_set():
+        if sock is None:
+            sock = connect()
+        if sock is not None:
+            try:
+                raw = sock.recv(65536)
+                if not raw:
+                    sock.close()
+                    sock = None
+                else:
+                    data = json.dumps(json.loads(raw.decode("utf-8"))).encode("utf-8")
+                    out.write(struct.pack("<I", len(data)) + data)
+                    out.flush()
+            except Exception:
+                try:
+                    sock.close()
+                except Exception:
+                    pass
+                sock = None
+        time.sleep(0.05)
+
+
+def command(i: int) -> dict:
+    return {"action": "youtube_control", "command": "volume_up", "query": "", "value": 5, "id": i}
+
+
+def run(name, loop_fn, encode, n_single, n_burst):
+    server = socket.socket()
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    port = server.getsockname()[1]
+
+    def connect():
+        try:
+            s = socket.create_connection(("127.0.0.1", port), 0.5)
+            s.settimeout(None)
+            return s
+        except OSError:
+            return None
+
+    out = FakeStdout()
+    stop = threading.Event()
+    host = threading.Thread(target=loop_fn, args=(stop, out, connect), daemon=True)
+    host.start()
+    bridge, _ = server.accept()
+    bridge.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    time.sleep(0.2)
+
+    sent = {}
+    for i in range(n_single):
+        sent[i] = time.perf_counter()
+        bridge.sendall(encode(command(i)))
+        deadline = time.time() + 1
+        while i not in out.arrivals and time.time() < deadline:
+            time.sleep(0.0002)
+        time.sleep(0.01)
+    lat = sorted((out.arrivals[i] - sent[i]) * 1000 for i in sent if i in out.arrivals)
+
+    # Ráfaga: todos los comandos en un solo sendall (como varios POST seguidos)
+    ids = range(n_single, n_single + n_burst)
+    t0 = time.perf_counter()
+    bridge.sendall(b"".join(encode(command(i)) for i in ids))
+    deadline = time.time() + 2
+    while not all(i in out.arrivals for i in ids) and time.time() < deadline:
+        time.sleep(0.001)
+    got = [out.arrivals[i] for i in ids if i in out.arrivals]
+    burst_ms = (max(got) - t0) * 1000 if got else float("nan")
+
+    stop.set()
+    bridge.close()
+    server.close()
+    host.join(2)
+
+    p95 = lat[int(len(lat) * 0.95) - 1] if lat else float("nan")
+    print(f"  {name:<26} suelto p50 {statistics.median(lat) if lat else float('nan'):7.3f} ms  "
+          f"p95 {p95:7.3f} ms  max {lat[-1] if lat else float('nan'):7.3f} ms | "
+          f"ráfaga {len(got)}/{n_burst} en {burst_ms:.2f} ms")
+
+
+def main():
+    n_single = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    n_burst = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    print(f"{n_single} comandos sueltos, ráfaga de {n_burst}")
+    run("recv + sleep 50 ms (antes)", legacy_loop, lambda obj: json.dumps(obj).encode("utf-8"), n_single, n_burst)
+    run("selectors + frames (ahora)", bridge_loop, encode_frame, n_single, n_burst)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark: WAV vs Ogg/Opus vs MP3 para el TTS del avatar.
+
+Por cada perfil sintetiza la misma respuesta en modo por frases y reporta:
+  - bytes en el cable (frame binario) y lo que sería en base64
+  - ms hasta tener el primer chunk (lo primero que suena)
+  - ms de transferencia de ese chunk por un WebSocket local (loopback)
+  - time_to_first_sound_ms = las dos anteriores
+Necesita credenciales de Azure:
+
+    AZURE_SPEECH_KEY=... AZURE_SPEECH_REGION=eastus python benchmarks/bench_tts_formats.py
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import websockets
+
+from core import azure_tts
+from jarvis_avatar_web.server.framing import encode_binary
+
+TEXT = (
+    "Claro, ya abrí el video que me pediste. "
+    "Subí el volumen a la mitad para que no te truene en los audífonos. "
+    "Si quieres que lo adelante o ponga el siguiente, nada más dime."
+)
+
+
+async def loopback_send_ms(frame: bytes) -> float:
+    got = asyncio.Event()
+
+    async def sink(ws):
+        async for _ in ws:
+            got.set()
+
+    async with websockets.serve(sink, "127.0.0.1", 0, max_size=2**24) as server:
+        port = server.sockets[0].getsockname()[1]
+        async with websockets.connect(f"ws://127.0.0.1:{port}", max_size=2**24) as ws:
+            t0 = time.perf_counter()
+            await ws.send(frame)
+            await got.wait()
+            return (time.perf_counter() - t0) * 1000
+
+
+def run_profile(profile, key, region, voice):
+    # Sin cache: queremos medir a Azure
+    azure_tts.enable_cache(None)
+    azure_tts.get_manager(key, region).warm_up(voice, profile=profile)
+
+    t0 = time.perf_counter()
+    first_ms = None
+    first_frame = None
+    total_bytes = 0
+    b64_bytes = 0
+    chunks = 0
+    for part in azure_tts.synthesize_chunked(TEXT, key=key, region=region, voice=voice, profile=profile):
+        audio = part.pop("audio")
+        frame = encode_binary(dict(part, type="tts", format=profile), audio)
+        if first_ms is None:
+            first_ms = (time.perf_counter() - t0) * 1000
+            first_frame = frame
+        total_bytes += len(frame)
+        b64_bytes += len(json.dumps(dict(part, type="tts", audio_b64="x" * ((len(audio) + 2) // 3 * 4))))
+        chunks += 1
+    total_ms = (time.perf_counter() - t0) * 1000
+
+    wire_ms = asyncio.run(loopback_send_ms(first_frame))
+    return {
+        "profile": profile,
+        "chunks": chunks,
+        "bytes_binary": total_bytes,
+        "bytes_base64_json": b64_bytes,
+        "first_chunk_ms": round(first_ms, 1),
+        "first_chunk_wire_ms": round(wire_ms, 2),
+        "time_to_first_sound_ms": round(first_ms + wire_ms, 1),
+        "total_ms": round(total_ms, 1),
+    }
+
+
+def main():
+    key = os.environ.get("AZURE_SPEECH_KEY", "")
+    region = os.environ.get("AZURE_SPEECH_REGION", "eastus")
+    voice = os.environ.get("AZURE_SPEECH_VOICE", "es-MX-DaliaNeural")
+    if not key:
+        print("Falta AZURE_SPEECH_KEY")
+        return 2
+
+    results = [run_profile(p, key, region, voice) for p in ("wav", "opus", "mp3")]
+    wav = results[0]["bytes_binary"]
+    for r in results:
+        r["size_vs_wav"] = round(r["bytes_binary"] / wav, 3) if wav else None
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
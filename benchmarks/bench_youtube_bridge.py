@@ -0,0 +1,98 @@
+"""
+Benchmark: tiempo de bridge por comando de YouTube (youtube_control ->
+http_bridge -> socket del native host).
+
+Compara requests.post por comando (antes) con BridgeClient keep-alive por
+TCP y por Unix socket. Levanta el http_bridge en este proceso y un native
+host falso que solo lee el socket. También mide un comando enviado mientras
+otro cliente dejó una conexión colgada a medio request (con el server de un
+solo hilo eso frenaba a todos).
+
+Uso:  python benchmarks/bench_youtube_bridge.py [N]
+"""
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "native_bridge"))
+
+import requests
+
+import http_bridge
+from actions.youtube_ext import BridgeClient
+
+
+def free_port() -> int:
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def start_bridge(uds_path):
+    http_bridge.HTTP_PORT = free_port()
+    http_bridge.TCP_PORT = free_port()
+    threading.Thread(target=http_bridge.tcp_accept_loop, daemon=True).start()
+    threading.Thread(target=http_bridge.serve_unix, args=(uds_path,), daemon=True).start()
+    threading.Thread(
+        target=lambda: http_bridge.ThreadingHTTPServer(
+            (http_bridge.HTTP_HOST, http_bridge.HTTP_PORT), http_bridge.Handler
+        ).serve_forever(),
+        daemon=True,
+    ).start()
+    time.sleep(0.2)
+
+    # Native host falso: se conecta y consume todo lo que le llegue
+    host = socket.create_connection(("127.0.0.1", http_bridge.TCP_PORT))
+
+    def drain():
+        while host.recv(65536):
+            pass
+
+    threading.Thread(target=drain, daemon=True).start()
+    while http_bridge._native_conn is None:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{http_bridge.HTTP_PORT}/command"
+
+
+def measure(name, send, n):
+    payload = {"action": "youtube_control", "command": "volume_up", "query": "", "value": 5}
+    send(payload)   # calentar
+    lat = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        send(payload)
+        lat.append((time.perf_counter() - t0) * 1000)
+    lat.sort()
+    print(f"  {name:<32} p50 {statistics.median(lat):7.3f} ms  p95 {lat[int(n * 0.95) - 1]:7.3f} ms")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    uds_path = os.path.join(tempfile.mkdtemp(), "bridge.sock")
+    url = start_bridge(uds_path)
+    print(f"{n} comandos seguidos")
+
+    measure("requests.post (antes)", lambda p: requests.post(url, json=p, timeout=3).raise_for_status(), n)
+    tcp = BridgeClient(url)
+    measure("BridgeClient TCP keep-alive", tcp.post, n)
+    uds = BridgeClient(url, uds_path=uds_path)
+    measure("BridgeClient Unix socket", uds.post, n)
+
+    # Un cliente que manda headers a medias y se queda colgado
+    stalled = socket.create_connection(("127.0.0.1", http_bridge.HTTP_PORT))
+    stalled.sendall(b"POST /command HTTP/1.1\r\nContent-Length: 100\r\n\r\n{")
+    time.sleep(0.05)
+    measure("TCP con otra conexión colgada", tcp.post, n)
+    stalled.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,4 +4,11 @@ MODEL_NAME = "deepseek-chat"
 
 MAX_TOKENS = 800
 
-TEMPERATURE = 0.2
\ No newline at end of file
+TEMPERATURE = 0.2
+
+# Respuestas en streaming (SSE): emoción/voz arrancan antes de que termine el modelo
+STREAM_RESPONSES = True
+
+# Memoria: presupuesto (tokens estimados) del historial y de su resumen
+CONTEXT_TOKEN_BUDGET = 1500
+SUMMARY_TOKEN_BUDGET = 300
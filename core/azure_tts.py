@@ -1,88 +1,443 @@
 import base64
-import os
-import tempfile
+import queue
+import re
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import azure.cognitiveservices.speech as speechsdk
 
+# PCM crudo en memoria (sin archivo temporal); el header WAV lo armamos aquí
+SAMPLE_RATE = 16000
+STREAM_FORMAT = speechsdk.SpeechSynthesisOutputFormat.Raw16Khz16BitMonoPcm
 
-def synthesize_tts_with_visemes(
-    text: str,
-    *,
-    key: str,
-    region: str,
-    voice: str = "es-MX-DaliaNeural",
-):
-    text = (text or "").strip()
-    if not text:
-        return "", []
+# Perfiles de salida. "wav" = PCM crudo + header nuestro; los comprimidos
+# ya vienen en su contenedor (ogg / mp3) y el navegador los decodifica igual
+# (decodeAudioData detecta el formato solo; el frame lleva "format").
+AUDIO_PROFILES = {
+    "wav": {"format": STREAM_FORMAT},
+    "opus": {"format": speechsdk.SpeechSynthesisOutputFormat.Ogg16Khz16BitMonoOpus},
+    "mp3": {"format": speechsdk.SpeechSynthesisOutputFormat.Audio16Khz32KBitRateMonoMp3},
+}
+STREAM_CHUNK_BYTES = 3200     # 100 ms de audio 16 kHz / 16-bit / mono
+PCM_BYTES_PER_MS = SAMPLE_RATE * 2 // 1000
+
+# TTS por frases: cortes en fin de oración y, si hace falta, en comas / punto y coma
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+_CLAUSE_END = re.compile(r"(?<=[,;:])\s+")
 
-    speech_config = speechsdk.SpeechConfig(subscription=key, region=region)
-    speech_config.speech_synthesis_voice_name = voice
-    speech_config.set_speech_synthesis_output_format(
-        speechsdk.SpeechSynthesisOutputFormat.Riff16Khz16BitMonoPcm
+
+def pcm_to_wav(pcm: bytes, sample_rate: int = SAMPLE_RATE, channels: int = 1, bits: int = 16) -> bytes:
+    byte_rate = sample_rate * channels * bits // 8
+    block_align = channels * bits // 8
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + len(pcm), b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, byte_rate, block_align, bits,
+        b"data", len(pcm),
     )
+    return header + pcm
+
 
-    # ✅ salida a archivo temporal (evita tema de default speaker)
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-    tmp_path = tmp.name
-    tmp.close()
+def _cancel_error(details) -> RuntimeError:
+    # ✅ Diagnóstico correcto de cancelación (API real)
+    reason = getattr(details, "reason", None)
+    code = getattr(details, "error_code", None)
+    info = getattr(details, "error_details", None)
+    return RuntimeError(
+        "TTS canceled: "
+        f"reason={reason} "
+        f"error_code={code} "
+        f"error_details={info}"
+    )
 
-    audio_config = speechsdk.audio.AudioOutputConfig(filename=tmp_path)
-    synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=audio_config)
 
-    visemes = []
+class _PooledSynthesizer:
+    """Un SpeechSynthesizer con su conexión abierta y callbacks conectados una sola vez."""
 
-    def on_viseme(evt: speechsdk.SpeechSynthesisVisemeEventArgs):
-        visemes.append({
-            "t": int(evt.audio_offset / 10_000),  # 100ns -> ms
-            "id": int(evt.viseme_id),
-        })
+    def __init__(self, speech_config):
+        self.synth = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=None)
+        self.connection = speechsdk.Connection.from_speech_synthesizer(self.synth)
+        self.connected = threading.Event()
+        self.finished = threading.Event()
+        self.visemes = queue.Queue()
+        self.duration_ms = None
+        self.canceled = False
+        self.connected_at = None     # perf_counter() del último "connected"
 
-    synthesizer.viseme_received.connect(on_viseme)
+        self.connection.connected.connect(self._on_connected)
+        self.connection.disconnected.connect(lambda evt: self.connected.clear())
+        self.synth.viseme_received.connect(self._on_viseme)
+        self.synth.synthesis_completed.connect(self._on_completed)
+        self.synth.synthesis_canceled.connect(self._on_canceled)
 
-    result = synthesizer.speak_text_async(text).get()
+    def open(self, wait: float = 0.0):
+        if not self.connected.is_set():
+            self.connection.open(True)
+            if wait:
+                self.connected.wait(timeout=wait)
 
-    # ✅ Diagnóstico correcto de cancelación (API real)
-    if result.reason == speechsdk.ResultReason.Canceled:
-        try:
-            c = speechsdk.SpeechSynthesisCancellationDetails.from_result(result)
-            reason = getattr(c, "reason", None)
-            code = getattr(c, "error_code", None)
-            details = getattr(c, "error_details", None)
-        except Exception as e:
-            reason = None
-            code = None
-            details = f"(No pude leer CancellationDetails: {repr(e)})"
-
-        # limpia tmp
+    def close(self):
+        """Desconecta los callbacks antes de soltarlo (si no, el SDK aborta al salir)."""
+        for signal in (self.connection.connected, self.connection.disconnected,
+                       self.synth.viseme_received, self.synth.synthesis_completed,
+                       self.synth.synthesis_canceled):
+            try:
+                signal.disconnect_all()
+            except Exception:
+                pass
         try:
-            os.remove(tmp_path)
+            self.connection.close()
         except Exception:
             pass
 
-        raise RuntimeError(
-            "TTS canceled: "
-            f"reason={reason} "
-            f"error_code={code} "
-            f"error_details={details}"
-        )
+    def reset(self):
+        self.finished.clear()
+        self.duration_ms = None
+        self.canceled = False
+        self.drain()
+
+    def drain(self):
+        out = []
+        while True:
+            try:
+                out.append(self.visemes.get_nowait())
+            except queue.Empty:
+                return out
 
-    if result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
+    def _on_connected(self, evt):
+        self.connected_at = time.perf_counter()
+        self.connected.set()
+
+    def _on_completed(self, evt):
+        # Duración real del audio (en formatos comprimidos no sale de los bytes)
         try:
-            os.remove(tmp_path)
+            self.duration_ms = int(evt.result.audio_duration.total_seconds() * 1000)
         except Exception:
-            pass
-        raise RuntimeError(f"TTS failed: {result.reason}")
+            self.duration_ms = None
+        self.finished.set()
 
-    # ✅ leer WAV
-    try:
-        with open(tmp_path, "rb") as f:
-            audio_bytes = f.read()
-    finally:
+    def _on_canceled(self, evt):
+        # Turno cancelado: sin duración ni visemes a medias para el siguiente.
+        # Corre en un hilo del SDK: nada de excepciones desde acá.
         try:
-            os.remove(tmp_path)
+            self.canceled = True
+            self.duration_ms = None
+            self.drain()
         except Exception:
             pass
+        self.finished.set()
+
+    def _on_viseme(self, evt: speechsdk.SpeechSynthesisVisemeEventArgs):
+        self.visemes.put({
+            "t": int(evt.audio_offset / 10_000),  # 100ns -> ms
+            "id": int(evt.viseme_id),
+        })
+
+
+class SynthesizerManager:
+    """
+    Mantiene SpeechConfig cacheados por (voz, formato) y un pool pequeño de
+    synthesizers con el websocket ya abierto, para no pagar el handshake
+    con Azure en cada frase. Cada stream() deja en meta["timing"] su propio
+    connect / primer byte / total (ms) (varios chunks corren en paralelo, no
+    hay un "último" compartido); connect_ms es None si el websocket no llegó
+    a conectar.
+    """
+
+    def __init__(self, key: str, region: str, pool_size: int = 2):
+        self.key = key
+        self.region = region
+        self.pool_size = pool_size
+
+        self._configs = {}
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def warm_up(self, voice: str, profile: str = "wav", wait: float = 5.0):
+        """Crea y conecta pool_size synthesizers para esa voz/perfil."""
+        output_format = AUDIO_PROFILES[profile]["format"]
+        pool = self._pool(voice, output_format)
+        while pool.qsize() < self.pool_size:
+            ps = _PooledSynthesizer(self._config(voice, output_format))
+            ps.open(wait=wait)
+            pool.put(ps)
+
+    def stream(self, text: str, voice: str, output_format=STREAM_FORMAT,
+               chunk_bytes: int = STREAM_CHUNK_BYTES, meta: dict = None):
+        t0 = time.perf_counter()
+        pool = self._pool(voice, output_format)
+        try:
+            ps = pool.get_nowait()
+        except queue.Empty:
+            ps = _PooledSynthesizer(self._config(voice, output_format))
+        # reused: el websocket ya estaba abierto antes de este turno. Si no,
+        # open() no bloquea: connect_ms sale de cuándo llegó "connected".
+        reused = ps.connected.is_set()
+        ps.open()
+        ps.reset()
+
+        timing = {"cached": False, "connect_ms": 0.0 if reused else None,
+                  "first_byte_ms": None, "total_ms": None, "reused": reused}
+        if meta is not None:
+            meta["timing"] = timing
+
+        healthy = False
+        try:
+            result = ps.synth.start_speaking_text_async(text).get()
+            if result.reason == speechsdk.ResultReason.Canceled:
+                raise _cancel_error(speechsdk.SpeechSynthesisCancellationDetails.from_result(result))
+
+            stream = speechsdk.AudioDataStream(result)
+            buf = bytes(chunk_bytes)
+
+            while True:
+                n = stream.read_data(buf)
+                if n == 0:
+                    break
+                if timing["first_byte_ms"] is None:
+                    timing["first_byte_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+                yield buf[:n], ps.drain()
+
+            if stream.status == speechsdk.StreamStatus.Canceled:
+                raise _cancel_error(stream.cancellation_details)
+
+            # Los últimos visemes pueden llegar justo después del audio
+            ps.finished.wait(timeout=2.0)
+            timing["audio_ms"] = ps.duration_ms
+            if meta is not None:
+                meta["duration_ms"] = ps.duration_ms
+            tail = ps.drain()
+            if tail:
+                yield b"", tail
+
+            healthy = not ps.canceled
+        finally:
+            timing["total_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+            if not reused and ps.connected_at is not None:
+                timing["connect_ms"] = round(max(0.0, ps.connected_at - t0) * 1000, 2)
+            # Un synthesizer cancelado / a medias no regresa al pool
+            if healthy and pool.qsize() < self.pool_size:
+                pool.put(ps)
+            else:
+                ps.close()
+
+    # --- internals ---
+    def _config(self, voice, output_format):
+        k = (voice, output_format)
+        with self._lock:
+            cfg = self._configs.get(k)
+            if cfg is None:
+                cfg = speechsdk.SpeechConfig(subscription=self.key, region=self.region)
+                cfg.speech_synthesis_voice_name = voice
+                cfg.set_speech_synthesis_output_format(output_format)
+                self._configs[k] = cfg
+            return cfg
+
+    def _pool(self, voice, output_format) -> queue.Queue:
+        k = (voice, output_format)
+        with self._lock:
+            return self._pools.setdefault(k, queue.Queue())
+
+
+# Cache opcional en disco (core/tts_cache.py); None = siempre Azure
+_cache = None
+
+def enable_cache(cache):
+    global _cache
+    _cache = cache
+
+def cache_stats():
+    return _cache.stats() if _cache is not None else None
+
+def synthesize_audio(text: str, *, key: str, region: str,
+                     voice: str = "es-MX-DaliaNeural", profile: str = "wav", meta: dict = None):
+    """
+    (audio, visemes, duration_ms) completos, con el audio listo para el avatar
+    (WAV con header, o el ogg/mp3 tal cual). Consulta el cache antes de Azure.
+    Si se pasa meta (dict), trae "timing" de esta llamada ({"cached": True} si
+    salió del cache).
+    """
+    if meta is None:
+        meta = {}
+    fmt = AUDIO_PROFILES[profile]["format"].name
+    t0 = time.perf_counter()
+    hit = _cache.get(text, voice, fmt) if _cache is not None else None
+
+    if hit is not None:
+        raw, visemes, duration_ms = hit
+        meta["timing"] = {"cached": True, "total_ms": round((time.perf_counter() - t0) * 1000, 2)}
+    else:
+        raw = bytearray()
+        visemes = []
+        for chunk, new_visemes in stream_tts_with_visemes(
+            text, key=key, region=region, voice=voice, profile=profile, meta=meta
+        ):
+            raw += chunk
+            visemes.extend(new_visemes)
+        raw = bytes(raw)
+
+        if profile == "wav":
+            duration_ms = len(raw) // PCM_BYTES_PER_MS
+        else:
+            duration_ms = meta.get("duration_ms")
+            if duration_ms is None:
+                # Sin audio_duration del SDK: al menos no se encima con el último viseme
+                duration_ms = (visemes[-1]["t"] + 150) if visemes else 0
+
+        if _cache is not None and raw:
+            try:
+                _cache.put(text, voice, fmt, raw, visemes, duration_ms)
+            except OSError as e:
+                print("[TTS CACHE] no pude guardar:", repr(e))
+
+    if not raw:
+        return b"", visemes, 0
+    audio = pcm_to_wav(raw) if profile == "wav" else raw
+    return audio, visemes, duration_ms
 
-    audio_b64 = base64.b64encode(audio_bytes).decode("utf-8")
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+def get_manager(key: str, region: str) -> SynthesizerManager:
+    with _managers_lock:
+        mgr = _managers.get((key, region))
+        if mgr is None:
+            mgr = _managers[(key, region)] = SynthesizerManager(key, region)
+        return mgr
+
+
+def stream_tts_with_visemes(
+    text: str,
+    *,
+    key: str,
+    region: str,
+    voice: str = "es-MX-DaliaNeural",
+    chunk_bytes: int = STREAM_CHUNK_BYTES,
+    profile: str = "wav",
+    meta: dict = None,
+):
+    """
+    Sintetiza en memoria y va devolviendo (yield) tuplas (audio, visemes):
+    audio son bytes PCM 16 kHz/16-bit/mono (perfil "wav") o del contenedor
+    comprimido, y visemes los eventos {"t": ms, "id": n} que llegaron hasta
+    ese momento. El primer chunk sale antes de que Azure termine de sintetizar.
+    Si se pasa meta (dict), al final trae "duration_ms".
+    """
+    text = (text or "").strip()
+    if not text:
+        return
+
+    yield from get_manager(key, region).stream(
+        text, voice, AUDIO_PROFILES[profile]["format"], chunk_bytes=chunk_bytes, meta=meta
+    )
+
+
+def synthesize_tts_wav(
+    text: str,
+    *,
+    key: str,
+    region: str,
+    voice: str = "es-MX-DaliaNeural",
+):
+    """(wav_bytes, visemes): para mandar el audio en un frame binario."""
+    text = (text or "").strip()
+    if not text:
+        return b"", []
+
+    wav, visemes, _duration = synthesize_audio(text, key=key, region=region, voice=voice)
+    if not wav:
+        raise RuntimeError("TTS failed: audio vacío")
+    return wav, visemes
+
+
+def synthesize_tts_with_visemes(
+    text: str,
+    *,
+    key: str,
+    region: str,
+    voice: str = "es-MX-DaliaNeural",
+):
+    wav, visemes = synthesize_tts_wav(text, key=key, region=region, voice=voice)
+    if not wav:
+        return "", []
+
+    audio_b64 = base64.b64encode(wav).decode("utf-8")
     return audio_b64, visemes
+
+
+def split_speech(text: str, min_chars: int = 40, max_chars: int = 160) -> list:
+    """
+    Parte el texto en oraciones; las muy largas se cortan en cláusulas y
+    las muy cortas se juntan con la siguiente (cada request a Azure cuesta).
+    """
+    text = " ".join((text or "").split())
+    if not text:
+        return []
+
+    pieces = []
+    for sentence in _SENTENCE_END.split(text):
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+        else:
+            pieces.extend(_CLAUSE_END.split(sentence))
+
+    chunks = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) < min_chars and len(chunks[-1]) + len(piece) < max_chars:
+            chunks[-1] = chunks[-1] + " " + piece
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+def synthesize_chunked(
+    text: str,
+    *,
+    key: str,
+    region: str,
+    voice: str = "es-MX-DaliaNeural",
+    max_parallel: int = 2,
+    profile: str = "wav",
+):
+    """
+    TTS por frases en paralelo (máximo max_parallel requests a la vez).
+    Devuelve (yield) en orden, en cuanto cada uno está listo:
+        {"chunk": i, "last": bool, "offset_ms": n, "audio": wav_bytes, "visemes": [...],
+         "timing": {...}}
+    con los "t" de los visemes rebasados a una sola línea de tiempo continua
+    (con la duración real de cada chunk, también en opus / mp3).
+    """
+    parts = split_speech(text)
+    if not parts:
+        return
+
+    pool = ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="azure-tts")
+    try:
+        metas = [{} for _ in parts]
+        futures = [
+            pool.submit(synthesize_audio, part, key=key, region=region, voice=voice,
+                        profile=profile, meta=meta)
+            for part, meta in zip(parts, metas)
+        ]
+
+        offset_ms = 0
+        for i, fut in enumerate(futures):
+            audio, visemes, duration_ms = fut.result()
+            if not audio:
+                raise RuntimeError(f"TTS failed: audio vacío (chunk {i})")
+
+            yield {
+                "chunk": i,
+                "last": i == len(futures) - 1,
+                "offset_ms": offset_ms,
+                "audio": audio,
+                "visemes": [{"t": v["t"] + offset_ms, "id": v["id"]} for v in visemes],
+                "timing": metas[i].get("timing"),
+            }
+            offset_ms += duration_ms
+    finally:
+        # Si el consumidor corta (o falla un chunk) no seguimos sintetizando
+        pool.shutdown(wait=False, cancel_futures=True)
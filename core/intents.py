@@ -0,0 +1,215 @@
+import re
+import unicodedata
+from collections import Counter
+
+# Frases (ya normalizadas: minúsculas, sin acentos ni signos) -> comando youtube_control.
+# Solo se activan los comandos que aparecen en el schema del SYSTEM_PROMPT.
+YOUTUBE_PHRASES = {
+    "play": [
+        "play", "dale play", "reproduce", "reproduce el video", "reanuda",
+        "reanuda el video", "continua", "continua el video", "quita la pausa",
+    ],
+    "pause": [
+        "pausa", "pausa el video", "pon pausa", "ponle pausa", "deten el video",
+        "para el video", "detente", "stop",
+    ],
+    "volume_up": [
+        "sube el volumen", "sube volumen", "subele", "subele al volumen",
+        "mas volumen", "mas fuerte", "subele tantito",
+    ],
+    "volume_down": [
+        "baja el volumen", "baja volumen", "bajale", "bajale al volumen",
+        "menos volumen", "mas bajo", "bajale tantito",
+    ],
+    "seek_forward": [
+        "adelanta", "adelanta el video", "adelantalo", "avanza", "avanza el video",
+    ],
+    "seek_backward": [
+        "regresa", "regresa el video", "regresalo", "atrasa", "atrasa el video",
+        "retrocede",
+    ],
+    "next": [
+        "siguiente", "siguiente video", "el siguiente", "el que sigue",
+        "pasa al siguiente", "pon el siguiente",
+    ],
+    "prev": [
+        "anterior", "video anterior", "el anterior", "pon el anterior",
+        "regresa al anterior",
+    ],
+}
+
+YOUTUBE_SPEECH = {
+    "play": "Reproduciendo.",
+    "pause": "Pausado.",
+    "toggle": "Listo.",
+    "volume_up": "Subiendo el volumen.",
+    "volume_down": "Bajando el volumen.",
+    "set_volume": "Volumen ajustado.",
+    "seek_forward": "Adelantando.",
+    "seek_backward": "Regresando un poco.",
+    "next": "Siguiente video.",
+    "prev": "Video anterior.",
+    "open_video": "Buscando en YouTube.",
+}
+
+# Alias en español -> clave de ALLOWED_APPS (se ignoran si la clave no existe)
+APP_ALIASES = {
+    "calculadora": "calc",
+    "bloc de notas": "notepad",
+    "block de notas": "notepad",
+    "notas": "notepad",
+    "explorador": "explorer",
+    "explorador de archivos": "explorer",
+    "terminal": "cmd",
+    "consola": "cmd",
+    "simbolo del sistema": "cmd",
+}
+
+_FILLERS = re.compile(r"^(?:oye |jarvis )+|(?: por favor| porfa| jarvis)+$")
+
+_RE_OPEN_APP = re.compile(r"^(?:abre|abrir|abreme|inicia|ejecuta|lanza)(?: el| la| los| las| un| una| mi)? (.+)$")
+_RE_SET_VOLUME = re.compile(
+    r"^(?:pon |ponle |ajusta |sube |baja )?(?:el )?volumen (?:al?|en) (\d{1,3})(?: ?%| por ciento)?$"
+)
+# "pon el video siguiente", "el siguiente video", "video anterior"... (antes de open_video)
+_RE_NAV_VIDEO = re.compile(
+    r"^(?:(?:pon|ponme|pasa|ve|regresa|vete)(?: al| el| a el)? )?(?:el |al )?"
+    r"(?:video (siguiente|anterior)|(siguiente|anterior) video)$"
+)
+_NAV_COMMANDS = {"siguiente": "next", "anterior": "prev"}
+# Búsquedas que solo son navegación / tiempo ("el de ayer") -> mejor que decida el LLM
+_VAGUE_QUERY_WORDS = {
+    "siguiente", "anterior", "ayer", "hoy", "manana", "anoche", "antier", "otro",
+    "ultimo", "pasado", "nuevo", "este", "ese", "que", "sigue", "de", "del",
+    "el", "la", "lo", "al",
+}
+_RE_OPEN_VIDEO = (
+    re.compile(r"^(?:pon|ponme|busca|reproduce|abre)(?: el| un)? video (?:de |sobre )?(.+)$"),
+    re.compile(r"^(?:pon|ponme|busca|reproduce) (.+) en youtube$"),
+)
+
+
+def normalize_utterance(text: str) -> str:
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w% ]+", " ", text)
+    text = " ".join(text.split())
+    return _FILLERS.sub("", text).strip()
+
+
+def schema_youtube_commands(system_prompt: str) -> set:
+    """Lee la lista de comandos de youtube_control del schema del prompt."""
+    m = re.search(r'"command"\s*:\s*"([^"]+)"', system_prompt or "")
+    if not m:
+        return set()
+    return {c.strip() for c in m.group(1).split("|") if c.strip()}
+
+
+class IntentRouter:
+    """
+    Atajo local para comandos comunes (YouTube / abrir apps).
+
+    route(texto) devuelve una respuesta con el mismo formato que el LLM
+    ({"emotion", "speech", "action"}) o None si no hay match claro,
+    en cuyo caso hay que preguntarle al modelo.
+    """
+
+    def __init__(self, system_prompt: str, allowed_apps: dict):
+        commands = schema_youtube_commands(system_prompt)
+        self._yt_enabled = "youtube_control" in (system_prompt or "")
+        self._commands = commands
+
+        # Índice exacto: frase normalizada -> acción
+        self._exact = {}
+        if self._yt_enabled:
+            for command, phrases in YOUTUBE_PHRASES.items():
+                if command not in commands:
+                    continue
+                for phrase in phrases:
+                    self._exact[phrase] = self._youtube(command)
+
+        self._apps = {name.lower(): name.lower() for name in allowed_apps}
+        for alias, name in APP_ALIASES.items():
+            if name in allowed_apps:
+                self._apps[alias] = name
+        self._open_app_enabled = "open_app" in (system_prompt or "")
+
+        self.hits = 0
+        self.misses = 0
+        self.by_intent = Counter()
+
+    def route(self, text: str):
+        reply = self._match(normalize_utterance(text))
+        if reply is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        action = reply["action"]
+        self.by_intent[action["data"].get("command") or action["type"]] += 1
+        return reply
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "by_intent": dict(self.by_intent),
+        }
+
+    # --- internals ---
+    def _match(self, text: str):
+        if not text:
+            return None
+
+        action = self._exact.get(text)
+        if action is not None:
+            return _reply(action)
+
+        if self._yt_enabled and "set_volume" in self._commands:
+            m = _RE_SET_VOLUME.match(text)
+            if m:
+                value = min(100, int(m.group(1))) / 100
+                return _reply(self._youtube("set_volume", value=value))
+
+        if self._yt_enabled:
+            m = _RE_NAV_VIDEO.match(text)
+            if m:
+                command = _NAV_COMMANDS[m.group(1) or m.group(2)]
+                return _reply(self._youtube(command)) if command in self._commands else None
+
+        if self._yt_enabled and "open_video" in self._commands:
+            for rx in _RE_OPEN_VIDEO:
+                m = rx.match(text)
+                if m:
+                    query = m.group(1)
+                    if set(query.split()) <= _VAGUE_QUERY_WORDS:
+                        return None
+                    return _reply(self._youtube("open_video", query=query))
+
+        if self._open_app_enabled:
+            m = _RE_OPEN_APP.match(text)
+            if m and m.group(1) in self._apps:
+                name = self._apps[m.group(1)]
+                return _reply(
+                    {"type": "open_app", "data": {"app_name": name}},
+                    speech=f"Abriendo {m.group(1)}.",
+                )
+
+        return None
+
+    def _youtube(self, command: str, **extra) -> dict:
+        data = {"command": command}
+        data.update(extra)
+        return {"type": "youtube_control", "data": data}
+
+
+def _reply(action: dict, speech: str = None) -> dict:
+    if speech is None:
+        speech = YOUTUBE_SPEECH.get(action["data"].get("command"), "Listo.")
+    return {
+        "emotion": "confident",
+        "speech": speech,
+        "action": {"type": action["type"], "data": dict(action["data"])},
+    }
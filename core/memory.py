@@ -1,14 +1,99 @@
-conversation = []
+from collections import deque
 
-def add_message(role, content):
-    conversation.append({
-        "role": role,
-        "content": content
-    })
+from config import CONTEXT_TOKEN_BUDGET, SUMMARY_TOKEN_BUDGET
+
+SUMMARY_HEADER = "Resumen de la conversación anterior:"
+SUMMARY_LINE_CHARS = 160      # recorte por turno dentro del resumen
+
+ROLE_LABELS = {"user": "Usuario", "assistant": "JARVIS"}
+
+def estimate_tokens(text: str) -> int:
+    """Estimación local (~4 caracteres por token + overhead por mensaje)."""
+    return len(text or "") // 4 + 4
+
+def summarize_locally(lines: deque, evicted: list) -> None:
+    """Resumen extractivo: una línea recortada por turno desalojado."""
+    for msg in evicted:
+        content = " ".join((msg.get("content") or "").split())
+        if len(content) > SUMMARY_LINE_CHARS:
+            content = content[:SUMMARY_LINE_CHARS - 1] + "…"
+        label = ROLE_LABELS.get(msg.get("role"), msg.get("role"))
+        lines.append(f"- {label}: {content}")
+
+
+class ConversationStore:
+    """
+    Historial recortado por presupuesto de tokens (no por número de mensajes).
+    Los turnos que salen se pliegan en un mensaje de resumen que se arma
+    una sola vez y queda cacheado hasta el siguiente desalojo.
+    """
+
+    def __init__(self, max_tokens: int = CONTEXT_TOKEN_BUDGET,
+                 summary_max_tokens: int = SUMMARY_TOKEN_BUDGET,
+                 summarizer=summarize_locally):
+        self.max_tokens = max_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.summarizer = summarizer
+
+        self._turns = deque()         # (msg, tokens)
+        self._tokens = 0
+        self._summary_lines = deque()
+        self._summary_tokens = 0
+        self._summary_msg = None
+        self._cache = None            # tupla inmutable lista para el prompt (sin copias)
+
+    def add(self, role, content):
+        msg = {"role": role, "content": content}
+        cost = estimate_tokens(content)
+        self._turns.append((msg, cost))
+        self._tokens += cost
+
+        evicted = []
+        # Siempre se queda al menos el último mensaje
+        while self._tokens > self.max_tokens and len(self._turns) > 1:
+            old, old_cost = self._turns.popleft()
+            self._tokens -= old_cost
+            evicted.append(old)
 
-    # Limitar memoria (últimos 10 mensajes)
-    if len(conversation) > 10:
-        conversation.pop(0)
+        if evicted:
+            self._fold(evicted)
+        self._cache = None
+
+    def messages(self) -> tuple:
+        if self._cache is None:
+            head = (self._summary_msg,) if self._summary_msg else ()
+            self._cache = head + tuple(msg for msg, _ in self._turns)
+        return self._cache
+
+    def tokens(self) -> int:
+        return self._tokens + self._summary_tokens
+
+    def clear(self):
+        self._turns.clear()
+        self._tokens = 0
+        self._summary_lines.clear()
+        self._summary_tokens = 0
+        self._summary_msg = None
+        self._cache = None
+
+    # --- internals ---
+    def _fold(self, evicted: list):
+        self.summarizer(self._summary_lines, evicted)
+
+        # El resumen también tiene presupuesto: se olvidan las líneas más viejas
+        total = sum(estimate_tokens(line) for line in self._summary_lines)
+        while total > self.summary_max_tokens and len(self._summary_lines) > 1:
+            total -= estimate_tokens(self._summary_lines.popleft())
+
+        content = SUMMARY_HEADER + "\n" + "\n".join(self._summary_lines)
+        self._summary_msg = {"role": "system", "content": content}
+        self._summary_tokens = estimate_tokens(content)
+
+
+store = ConversationStore()
+
+def add_message(role, content):
+    store.add(role, content)
 
 def get_conversation():
-    return conversation.copy()
+    return store.messages()
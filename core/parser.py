@@ -5,3 +5,116 @@ def parse_response(text):
         return json.loads(text)
     except json.JSONDecodeError:
         raise ValueError("La IA no devolvió JSON válido")
+
+
+class IncrementalResponseParser:
+    """
+    Lector JSON incremental para respuestas en streaming.
+
+    feed(fragmento) devuelve la lista de campos de primer nivel
+    ("emotion", "speech", "action", ...) que ya quedaron completos,
+    como tuplas (clave, valor). finish() devuelve el dict completo
+    (ValueError si el objeto quedó incompleto, igual que parse_response()).
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.fields = {}
+
+        self._pos = 0
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._done = False
+
+        self._expect = "key"      # key | colon | value | after_value
+        self._key = None
+        self._tok_start = None    # inicio de la clave/valor actual
+
+    def feed(self, chunk: str):
+        if not chunk:
+            return []
+        self.text += chunk
+        return self._scan()
+
+    def finish(self) -> dict:
+        if not self._done:
+            raise ValueError("La IA no devolvió JSON válido")
+        return dict(self.fields)
+
+    # --- internals ---
+    def _emit(self, end: int, out: list):
+        raw = self.text[self._tok_start:end]
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            raise ValueError("La IA no devolvió JSON válido")
+
+        self.fields[self._key] = value
+        out.append((self._key, value))
+        self._key = None
+        self._tok_start = None
+        self._expect = "after_value"
+
+    def _scan(self):
+        out = []
+        text = self.text
+        i = self._pos
+
+        while i < len(text) and not self._done:
+            c = text[i]
+
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif c == "\\":
+                    self._esc = True
+                elif c == '"':
+                    self._in_str = False
+                    if self._depth == 1:
+                        if self._expect == "key":
+                            self._key = json.loads(text[self._tok_start:i + 1])
+                            self._tok_start = None
+                            self._expect = "colon"
+                        elif self._expect == "value":
+                            self._emit(i + 1, out)
+                i += 1
+                continue
+
+            if self._depth == 0:
+                # Antes del objeto (p.ej. ```json): se ignora
+                if c == "{":
+                    self._depth = 1
+                i += 1
+                continue
+
+            if self._depth == 1:
+                if self._expect == "key" and c == '"':
+                    self._tok_start = i
+                elif self._expect == "colon" and c == ":":
+                    self._expect = "value"
+                    i += 1
+                    continue
+                elif self._expect == "value" and self._tok_start is None and not c.isspace():
+                    self._tok_start = i
+                elif self._expect == "value" and c in ",}":
+                    # fin de escalar (número, true/false/null)
+                    self._emit(i, out)
+                if c == "," and self._expect == "after_value":
+                    self._expect = "key"
+
+            if c == '"':
+                self._in_str = True
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._expect == "value":
+                    self._emit(i + 1, out)
+                elif self._depth == 0:
+                    self._done = True
+
+            i += 1
+
+        self._pos = i
+        return out
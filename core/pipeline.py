@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TurnPipeline:
+    """
+    Ejecuta los efectos secundarios de un turno (TTS, acciones, ...) en
+    background para que el REPL acepte el siguiente prompt de inmediato.
+
+    - Cada "lane" corre en orden (dos TTS no se pisan), pero lanes distintas
+      corren en paralelo: abrir un video no espera a que Azure termine.
+    - Cada etapa tiene su propio timeout; al vencerse se reporta y se deja
+      de esperar (el hilo no se puede matar, pero ya no bloquea la lane).
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="jarvis-turn")
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._lanes = {}
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run_thread, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self, timeout: float = 10.0):
+        """Espera (hasta timeout) a que terminen las etapas pendientes."""
+        deadline = time.time() + timeout
+        while self._pending and time.time() < deadline:
+            time.sleep(0.05)
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._pool.shutdown(wait=False)
+
+    def pending(self) -> int:
+        return self._pending
+
+    def submit(self, lane: str, fn, *args, timeout: float = None, on_done=None):
+        """
+        Encola fn(*args) en la lane indicada. on_done(result, error) se llama
+        al terminar (error es la excepción o TimeoutError). Devuelve un
+        concurrent.futures.Future con el resultado.
+        """
+        with self._pending_lock:
+            self._pending += 1
+        return asyncio.run_coroutine_threadsafe(
+            self._stage(lane, fn, args, timeout, on_done), self._loop
+        )
+
+    # --- internals ---
+    def _run_thread(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(self._ready.set)
+        self._loop.run_forever()
+
+    async def _stage(self, lane, fn, args, timeout, on_done):
+        lock = self._lanes.setdefault(lane, asyncio.Lock())
+        result = None
+        error = None
+        try:
+            async with lock:
+                t0 = time.perf_counter()
+                try:
+                    result = await asyncio.wait_for(
+                        self._loop.run_in_executor(self._pool, fn, *args), timeout
+                    )
+                except asyncio.TimeoutError:
+                    error = TimeoutError(f"{lane}: timeout tras {timeout}s")
+                    print(f"⏱️ [{lane}] timeout ({timeout}s), sigo sin esperar")
+                except Exception as e:
+                    error = e
+                else:
+                    ms = (time.perf_counter() - t0) * 1000
+                    print(f"[PIPE] {lane} {ms:.0f} ms")
+
+            if on_done is not None:
+                try:
+                    on_done(result, error)
+                except Exception as e:
+                    print(f"⚠️ [{lane}] on_done falló:", repr(e))
+            if error is not None:
+                raise error
+            return result
+        finally:
+            with self._pending_lock:
+                self._pending -= 1
@@ -0,0 +1,239 @@
+"""
+Cache en disco para TTS, direccionado por contenido.
+
+Clave = sha256(voz, formato, texto). Cada entrada es un archivo compacto:
+
+    b"JTT2" | u32 n_visemes | u32 duración_ms | n * (u32 t_ms, u8 id) | audio crudo
+
+Se lee con mmap y se desaloja por LRU (mtime) cuando el total pasa de
+max_bytes. Pre-cargar frases comunes:
+
+    python -m core.tts_cache seed --key <AZURE_KEY> --region eastus [--profile opus] [archivo.txt]
+    python -m core.tts_cache stats
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+
+MAGIC = b"JTT2"
+_HEADER = struct.Struct("<4sII")
+_VISEME = struct.Struct("<IB")
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tts_cache")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+COMMON_PHRASES = [
+    "Listo.",
+    "Sin acción.",
+    "Hola, ¿en qué te ayudo?",
+    "Claro.",
+    "Enseguida.",
+    "No pude completar eso.",
+    "Hubo un error, inténtalo de nuevo.",
+]
+
+
+def cache_key(text: str, voice: str, output_format: str) -> str:
+    h = hashlib.sha256()
+    for part in (voice, output_format, text):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class TTSCache:
+    def __init__(self, directory: str = DEFAULT_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.metrics = {
+            "hits": 0, "misses": 0,
+            "bytes_read": 0, "bytes_written": 0,
+            "evictions": 0,
+        }
+
+        self._lock = threading.Lock()
+        self._index = OrderedDict()     # key -> tamaño; el más viejo primero
+        self._size = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    # --- API ---
+    def get(self, text: str, voice: str, output_format: str):
+        """(audio, visemes, duration_ms) o None."""
+        key = cache_key(text, voice, output_format)
+        with self._lock:
+            known = key in self._index
+            if not known:
+                self.metrics["misses"] += 1
+        if not known:
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                audio, visemes, duration_ms = _decode(mm)
+            os.utime(path)
+        except (OSError, ValueError):
+            self._forget(key)
+            with self._lock:
+                self.metrics["misses"] += 1
+            return None
+
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+            self.metrics["hits"] += 1
+            self.metrics["bytes_read"] += len(audio)
+        return audio, visemes, duration_ms
+
+    def put(self, text: str, voice: str, output_format: str,
+            audio: bytes, visemes: list, duration_ms: int = 0):
+        if not audio:
+            return
+        key = cache_key(text, voice, output_format)
+        blob = _encode(audio, visemes, duration_ms)
+        path = self._path(key)
+
+        # Temporal único: dos hilos / procesos escribiendo la misma frase no
+        # se pisan; os.replace deja la entrada completa o la anterior.
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=key[:16], suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            self._size -= self._index.pop(key, 0)
+            self._index[key] = len(blob)
+            self._size += len(blob)
+            evict = self._evict_locked()
+            self.metrics["bytes_written"] += len(blob)
+        for old in evict:
+            try:
+                os.remove(self._path(old))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self.metrics, entries=len(self._index), size_bytes=self._size)
+        total = out["hits"] + out["misses"]
+        out["hit_rate"] = round(out["hits"] / total, 3) if total else 0.0
+        return out
+
+    # --- internals ---
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".tts")
+
+    def _load_index(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".tts"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name[:-4], st.st_size))
+
+        for _mtime, key, size in sorted(entries):
+            self._index[key] = size
+            self._size += size
+
+    def _evict_locked(self) -> list:
+        evicted = []
+        while self._size > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self._size -= size
+            evicted.append(key)
+        self.metrics["evictions"] += len(evicted)
+        return evicted
+
+    def _forget(self, key: str):
+        with self._lock:
+            self._size -= self._index.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+def _encode(audio: bytes, visemes: list, duration_ms: int) -> bytes:
+    parts = [_HEADER.pack(MAGIC, len(visemes), int(duration_ms or 0))]
+    parts.extend(_VISEME.pack(int(v["t"]), int(v["id"])) for v in visemes)
+    parts.append(audio)
+    return b"".join(parts)
+
+
+def _decode(buf) -> tuple:
+    magic, n, duration_ms = _HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError("entrada de cache inválida")
+    pos = _HEADER.size
+    visemes = []
+    for _ in range(n):
+        t, vid = _VISEME.unpack_from(buf, pos)
+        visemes.append({"t": t, "id": vid})
+        pos += _VISEME.size
+    return bytes(buf[pos:]), visemes, duration_ms
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.tts_cache")
+    parser.add_argument("command", choices=["seed", "stats"])
+    parser.add_argument("phrases", nargs="?", help="archivo con una frase por línea (seed)")
+    parser.add_argument("--dir", default=DEFAULT_DIR)
+    parser.add_argument("--key", default=os.environ.get("AZURE_SPEECH_KEY", ""))
+    parser.add_argument("--region", default=os.environ.get("AZURE_SPEECH_REGION", "eastus"))
+    parser.add_argument("--voice", default="es-MX-DaliaNeural")
+    parser.add_argument("--profile", default="wav", choices=["wav", "opus", "mp3"])
+    args = parser.parse_args(argv)
+
+    cache = TTSCache(args.dir)
+
+    if args.command == "stats":
+        print(cache.stats())
+        return 0
+
+    if not args.key:
+        print("Falta --key (o AZURE_SPEECH_KEY)")
+        return 2
+
+    from core import azure_tts
+    from core.intents import YOUTUBE_SPEECH
+
+    if args.phrases:
+        with open(args.phrases, encoding="utf-8") as f:
+            phrases = [line.strip() for line in f if line.strip()]
+    else:
+        phrases = COMMON_PHRASES + sorted(set(YOUTUBE_SPEECH.values()))
+
+    azure_tts.enable_cache(cache)
+    for text in phrases:
+        try:
+            azure_tts.synthesize_audio(
+                text, key=args.key, region=args.region, voice=args.voice, profile=args.profile
+            )
+            print("✔", text)
+        except Exception as e:
+            print("⚠️", text, repr(e))
+
+    print(cache.stats())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
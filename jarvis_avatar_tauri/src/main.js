@@ -435,6 +435,12 @@ function ensureAudio() {
   return audioCtx;
 }
 
+// audio: ArrayBuffer (frame binario) o string base64 (legado); WAV, ogg/opus o mp3
+function audioToArrayBuffer(audio) {
+  if (audio instanceof ArrayBuffer) return audio;
+  return Uint8Array.from(atob(audio), c => c.charCodeAt(0)).buffer;
+}
+
 function resetMouthTargets() {
   mouthTarget.aa = 0;
   mouthTarget.ih = 0;
@@ -465,11 +471,11 @@ function visemeToMouth(id) {
 }
 
 // Programa visemes basados en timestamps (ms) desde inicio de audio
-function scheduleVisemes(visemes, startAtAudioTime) {
+function scheduleVisemes(visemes, startAtAudioTime, clear = true) {
   if (!audioCtx) return;
   if (!Array.isArray(visemes)) return;
 
-  clearVisemeTimers();
+  if (clear) clearVisemeTimers();
 
   const sorted = [...visemes].sort((a, b) => (a.t ?? 0) - (b.t ?? 0));
 
@@ -493,7 +499,95 @@ function scheduleVisemes(visemes, startAtAudioTime) {
   }
 }
 
-async function playAzureTTS(audioB64, visemes = []) {
+// -----------------------------
+// TTS por frases (chunks de una misma respuesta)
+// -----------------------------
+// {utterance, chunk, last, offset_ms}: cada chunk se pega al anterior sin huecos
+let ttsUtterance = null;
+
+function stopUtterance() {
+  if (!ttsUtterance) return;
+  ttsUtterance.cancelled = true;
+  for (const s of ttsUtterance.sources) {
+    try { s.onended = null; s.stop(0); } catch {}
+  }
+  ttsUtterance = null;
+}
+
+function playAzureTTSChunk(msg) {
+  if (!ttsUtterance || ttsUtterance.id !== msg.utterance) {
+    // Nueva respuesta: corta lo que estuviera sonando
+    stopUtterance();
+    if (currentSrc) {
+      try { currentSrc.onended = null; currentSrc.stop(0); } catch {}
+      currentSrc = null;
+    }
+    clearVisemeTimers();
+    setMouthTargetsOnly(null, 0.0);
+
+    ttsUtterance = {
+      id: msg.utterance,
+      nextAt: 0,
+      sources: [],
+      chain: Promise.resolve(),
+      cancelled: false,
+    };
+  }
+
+  // decodeAudioData es async: encadenamos para no desordenar los chunks
+  const utt = ttsUtterance;
+  utt.chain = utt.chain.then(() => scheduleTTSChunk(utt, msg));
+}
+
+async function scheduleTTSChunk(utt, msg) {
+  ensureAudio();
+
+  if (audioCtx.state !== "running") {
+    try { await audioCtx.resume(); } catch (e) { console.log("[AUDIO] resume fail:", e); }
+  }
+
+  let audioBuffer;
+  try {
+    audioBuffer = await audioCtx.decodeAudioData(audioToArrayBuffer(msg.audio ?? msg.audio_b64));
+  } catch (e) {
+    console.log("[TTS] decodeAudioData FAIL (chunk " + msg.chunk + "):", e);
+    return;
+  }
+  if (utt.cancelled) return;
+
+  const src = audioCtx.createBufferSource();
+  src.buffer = audioBuffer;
+  src.connect(masterGain);
+  utt.sources.push(src);
+
+  // Justo después del chunk anterior; si llegó tarde, arranca ya
+  const startAt = Math.max(utt.nextAt, audioCtx.currentTime + 0.03);
+  utt.nextAt = startAt + audioBuffer.duration;
+
+  // Los visemes vienen en la línea de tiempo de toda la respuesta
+  const visemes = Array.isArray(msg.visemes) ? msg.visemes : [];
+  scheduleVisemes(visemes, startAt - (msg.offset_ms || 0) / 1000, false);
+
+  speaking = true;
+
+  src.onended = () => {
+    utt.sources = utt.sources.filter(s => s !== src);
+    if (msg.last && ttsUtterance === utt) {
+      ttsUtterance = null;
+      speaking = false;
+      clearVisemeTimers();
+      setMouthTargetsOnly(null, 0.0);
+    }
+  };
+
+  try {
+    src.start(startAt);
+  } catch (e) {
+    console.log("[TTS] src.start FAIL (chunk):", e);
+  }
+}
+
+async function playAzureTTS(audio, visemes = []) {
   ensureAudio();
 
   // Re-resume agresivo (Chrome a veces suspende)
@@ -502,6 +596,7 @@ async function playAzureTTS(audioB64, visemes = []) {
   }
 
   // ✅ STOP del audio anterior (esto suele arreglar el “alternado”)
+  stopUtterance();
   if (currentSrc) {
     try { currentSrc.onended = null; currentSrc.stop(0); } catch {}
     currentSrc = null;
@@ -509,11 +604,10 @@ async function playAzureTTS(audioB64, visemes = []) {
   clearVisemeTimers();
   setMouthTargetsOnly(null, 0.0);
 
-  // Decode base64 -> ArrayBuffer
+  // Decode (binario o base64) -> AudioBuffer
   let audioBuffer;
   try {
-    const bin = Uint8Array.from(atob(audioB64), c => c.charCodeAt(0));
-    audioBuffer = await audioCtx.decodeAudioData(bin.buffer);
+    audioBuffer = await audioCtx.decodeAudioData(audioToArrayBuffer(audio));
   } catch (e) {
     console.log("[TTS] decodeAudioData FAIL:", e);
     speaking = false;
@@ -554,21 +648,120 @@ async function playAzureTTS(audioB64, visemes = []) {
 const WS_URL = "ws://127.0.0.1:8765";
 let ws = null;
 
+// Replay: al reconectar le pedimos al hub lo que nos perdimos desde lastSeq.
+// Los repetidos se descartan por seq ya visto (no por máximo: un replay
+// puede llegar después de algo en vivo con seq mayor).
+let hubId = null;
+let lastSeq = 0;
+const seenSeqs = new Set();
+const SEEN_MAX = 2048;
+
+function firstSeen(seq) {
+  if (seenSeqs.has(seq)) return false;
+  seenSeqs.add(seq);
+  if (seenSeqs.size > SEEN_MAX) seenSeqs.delete(seenSeqs.values().next().value);
+  if (seq > lastSeq) lastSeq = seq;
+  return true;
+}
+
+// Frame binario: u32 big-endian largo del header | header JSON | audio crudo
+const textDecoder = new TextDecoder();
+
+function decodeBinaryFrame(buf) {
+  if (buf.byteLength < 4) return null;
+  const n = new DataView(buf).getUint32(0);
+  if (4 + n > buf.byteLength) return null;
+  try {
+    const msg = JSON.parse(textDecoder.decode(new Uint8Array(buf, 4, n)));
+    msg.audio = buf.slice(4 + n);
+    return msg;
+  } catch {
+    return null;
+  }
+}
+
+// Audio troceado: {frag, i, n, size, text} + pedazo. Se va copiando a un
+// buffer del tamaño final a medida que llega (sin esperar al último) y al
+// completarse se decodifica como el frame original.
+const partials = new Map();
+const MAX_PARTIALS = 8;
+
+function onFragment(msg) {
+  let p = partials.get(msg.frag);
+  if (!p) {
+    if (msg.i !== 0) return null;   // empezó antes de conectarnos
+    p = { buf: new Uint8Array(msg.size), off: 0, next: 0, n: msg.n, text: !!msg.text };
+    partials.set(msg.frag, p);
+    if (partials.size > MAX_PARTIALS) partials.delete(partials.keys().next().value);
+  }
+  const piece = new Uint8Array(msg.audio);
+  if (msg.i !== p.next || p.off + piece.byteLength > p.buf.byteLength) {
+    partials.delete(msg.frag);      // se perdió un pedazo: se descarta entero
+    return null;
+  }
+  p.buf.set(piece, p.off);
+  p.off += piece.byteLength;
+  p.next += 1;
+  if (p.next < p.n) return null;
+
+  partials.delete(msg.frag);
+  if (!p.text) return decodeBinaryFrame(p.buf.buffer);
+  try { return JSON.parse(textDecoder.decode(p.buf)); } catch { return null; }
+}
+
+function supportedCodecs() {
+  const a = document.createElement("audio");
+  const codecs = [];
+  if (a.canPlayType('audio/ogg; codecs="opus"')) codecs.push("opus");
+  if (a.canPlayType("audio/mpeg")) codecs.push("mp3");
+  codecs.push("wav");
+  return codecs;
+}
+
 function connectWS() {
   ws = new WebSocket(WS_URL);
-
-  ws.onopen = () => console.log("[WS] conectado:", WS_URL);
+  ws.binaryType = "arraybuffer";
+
+  ws.onopen = () => {
+    console.log("[WS] conectado:", WS_URL);
+    // Handshake: el hub le dice a JARVIS qué formatos de audio podemos decodificar
+    ws.send(JSON.stringify({
+      type: "hello",
+      role: "avatar",
+      codecs: supportedCodecs(),
+      subscribe: ["state", "emotion", "mouse", "say", "tts", "codecs"],
+      ...(hubId ? { hub: hubId, resume: lastSeq } : {}),
+    }));
+  };
   ws.onclose = () => setTimeout(connectWS, 1000);
   ws.onerror = (e) => console.log("[WS] error:", e);
 
   ws.onmessage = (ev) => {
     let msg;
-    try { msg = JSON.parse(ev.data); } catch { return; }
+    if (ev.data instanceof ArrayBuffer) {
+      msg = decodeBinaryFrame(ev.data);
+      if (!msg) return;
+    } else {
+      try { msg = JSON.parse(ev.data); } catch { return; }
+    }
+
+    if (typeof msg.seq === "number" && !firstSeen(msg.seq)) return;   // repetido por el replay
+
+    if (msg.frag !== undefined) {
+      msg = onFragment(msg);
+      if (!msg) return;
+    }
 
     console.log("[WS IN]", msg.type, msg);
 
     // Estado inicial (mood + opcional mouse)
     if (msg.type === "state") {
+      if (msg.hub && msg.hub !== hubId) {
+        // Hub nuevo (o reiniciado): su numeración empieza de cero
+        hubId = msg.hub;
+        lastSeq = 0;
+        seenSeqs.clear();
+      }
       if (typeof msg.emotion === "string") setMood(msg.emotion);
       if (msg.mouse && typeof msg.mouse.x === "number" && typeof msg.mouse.y === "number") {
         mouseNDC.x = msg.mouse.x;
@@ -615,7 +808,7 @@ function connectWS() {
       return;
     }
 
-    // ✅ tts: Azure WAV + visemes
+    // ✅ tts: Azure WAV (frame binario o audio_b64) + visemes
     if (msg.type === "tts") {
       if (typeof msg.emotion === "string") {
         const emo = msg.emotion.trim();
@@ -623,8 +816,13 @@ function connectWS() {
         else setMood(emo);
       }
 
-      if (typeof msg.audio_b64 === "string") {
-        playAzureTTS(msg.audio_b64, Array.isArray(msg.visemes) ? msg.visemes : []);
+      const audio = msg.audio ?? msg.audio_b64;
+      if (audio instanceof ArrayBuffer || typeof audio === "string") {
+        if (typeof msg.utterance === "string") {
+          playAzureTTSChunk(msg);
+        } else {
+          playAzureTTS(audio, Array.isArray(msg.visemes) ? msg.visemes : []);
+        }
       }
       return;
     }
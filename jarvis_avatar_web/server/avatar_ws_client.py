@@ -1,18 +1,49 @@
 import asyncio
 import json
+import itertools
 import threading
 import time
-from queue import Queue, Empty
+import uuid
+from collections import deque
 
 import websockets
 
+from jarvis_avatar_web.server.framing import FRAME_CHUNK_BYTES, encode_binary, split_frame
+
 WS_URL = "ws://127.0.0.1:8765"
 
+# Cuántos mensajes pendientes se mandan de una vez por despertar del sender
+SEND_BATCH_MAX = 32
+
+# Buffer de salida acotado con dos carriles: "control" (emotion, say...) sale
+# siempre antes que "bulk" (audio TTS). Si un carril se llena se tira lo más
+# viejo; emotions seguidas se funden en la última; y lo que pasó su TTL
+# (segundos) se descarta en vez de mandarse tarde al reconectar.
+# El audio se manda en pedazos de FRAME_CHUNK_BYTES (bulk cuenta pedazos:
+# 256 x 64 KB = 16 MB), así un utterance no tapa al control.
+LANE_MAX = {"control": 64, "bulk": 256}
+DEFAULT_TTL = {"emotion": 5.0, "say": 10.0, "tts": 10.0}
+FALLBACK_TTL = 10.0
+
 
 class AvatarWSClient:
     def __init__(self, url: str = WS_URL):
         self.url = url
-        self._q: Queue[dict] = Queue()
+        # Carriles (tipo, mensaje, vence): la API, desde cualquier hilo, encola
+        # en el loop con call_soon_threadsafe y despierta al sender, sin
+        # polling. Mensaje: dict (JSON) o str / bytes ya serializado. Sin loop
+        # corriendo se encola directo bajo el lock.
+        self._lanes = {lane: deque() for lane in LANE_MAX}
+        self._loop = None
+        self._wake = None               # asyncio.Event, vive en el loop
+        self._lock = threading.Lock()
+
+        self._frag_prefix = uuid.uuid4().hex[:6]
+        self._frag_ids = itertools.count(1)
+
+        self.dropped = 0
+        self.coalesced = 0
+        self.expired = 0
         self._thread = None
         self._stop = threading.Event()
 
@@ -20,6 +51,11 @@ class AvatarWSClient:
         self._last_err = ""
         self._last_connect_ts = 0.0
 
+        # Codecs que TODOS los avatares conectados saben decodificar (lo anuncia el hub)
+        self.codecs: list = []
+        # on_codecs(codecs): cuando cambian. Corre en el hilo del WS: que sea rápido.
+        self.on_codecs = None
+
     def start(self):
         if self._thread and self._thread.is_alive():
             return
@@ -29,13 +65,23 @@ class AvatarWSClient:
 
     def stop(self):
         self._stop.set()
+        with self._lock:
+            if self._loop is not None:
+                try:
+                    self._loop.call_soon_threadsafe(self._wake.set)
+                except RuntimeError:
+                    pass
 
     def status(self) -> dict:
         return {
             "connected": self._connected,
             "last_error": self._last_err,
             "last_connect_ts": self._last_connect_ts,
-            "queue_size": self._q.qsize(),
+            "queue_size": sum(len(q) for q in self._lanes.values()),
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "expired": self.expired,
+            "codecs": list(self.codecs),
             "url": self.url,
         }
 
@@ -43,23 +89,89 @@ class AvatarWSClient:
     def send_emotion(self, emotion: str):
         if not emotion:
             return
-        self._q.put({"type": "emotion", "emotion": emotion})
+        self._put({"type": "emotion", "emotion": emotion}, "emotion")
 
     def send_say(self, text: str, emotion: str = "neutral"):
         text = (text or "").strip()
         if not text:
             return
-        self._q.put({"type": "say", "emotion": emotion or "neutral", "text": text})
+        self._put({"type": "say", "emotion": emotion or "neutral", "text": text}, "say")
 
-    def send_raw(self, payload: dict):
-        if isinstance(payload, dict):
-            self._q.put(payload)
+    def send_raw(self, payload: dict, binary: bytes = None, ttl: float = None):
+        """
+        payload se manda como JSON; si viene binary (p.ej. WAV del TTS),
+        se manda como frame binario header+bytes, sin base64. Si es grande
+        (o es un tts JSON grande) sale en pedazos intercalables.
+        ttl: segundos que vale la pena mandarlo (default por tipo).
+        """
+        if not isinstance(payload, dict):
+            return
+        mtype = payload.get("type")
+        if binary is not None:
+            frame = encode_binary(payload, binary)
+        elif mtype == "tts":
+            frame = json.dumps(payload, ensure_ascii=False)
+        else:
+            self._put(payload, mtype, ttl)
+            return
+
+        if len(frame) <= FRAME_CHUNK_BYTES:
+            self._put(frame, mtype, ttl, bulk=True)
+            return
+        frag_id = f"{self._frag_prefix}-{next(self._frag_ids)}"
+        for part in split_frame(frame, frag_id, mtype):
+            self._put(part, mtype, ttl, bulk=True)
 
     # --- internals ---
+    def _put(self, msg, mtype=None, ttl=None, bulk=False):
+        if ttl is None:
+            ttl = DEFAULT_TTL.get(mtype, FALLBACK_TTL)
+        lane = "bulk" if bulk or mtype == "tts" else "control"
+        item = (lane, mtype, msg, time.monotonic() + ttl)
+        with self._lock:
+            if self._loop is not None:
+                try:
+                    self._loop.call_soon_threadsafe(self._enqueue, item)
+                    return
+                except RuntimeError:    # loop cerrado
+                    self._loop = None
+            self._enqueue(item)
+
+    def _enqueue(self, item):
+        lane, mtype, _, _ = item
+        q = self._lanes[lane]
+        if mtype == "emotion" and q and q[-1][1] == "emotion":
+            q[-1] = item
+            self.coalesced += 1
+        else:
+            if len(q) >= LANE_MAX[lane]:
+                q.popleft()
+                self.dropped += 1
+            q.append(item)
+        if self._wake is not None:
+            self._wake.set()
+
+    def _requeue(self, items):
+        """Lo no enviado vuelve al frente de su carril, en el mismo orden."""
+        for item in reversed(items):
+            self._lanes[item[0]].appendleft(item)
+
     def _run_thread(self):
         asyncio.run(self._main())
 
     async def _main(self):
+        with self._lock:
+            self._wake = asyncio.Event()
+            self._loop = asyncio.get_running_loop()
+
+        try:
+            await self._connect_loop()
+        finally:
+            with self._lock:
+                self._loop = None
+                self._wake = None
+
+    async def _connect_loop(self):
         while not self._stop.is_set():
             try:
                 async with websockets.connect(
@@ -73,46 +185,93 @@ class AvatarWSClient:
                     self._last_err = ""
                     self._last_connect_ts = time.time()
 
+                    # Solo producimos: del hub solo nos interesan los codecs (nada de mouse / eco de TTS)
+                    await ws.send(json.dumps({"type": "hello", "role": "producer", "subscribe": ["codecs"]}))
+
                     # ✅ corre sender y receiver a la vez
                     sender = asyncio.create_task(self._sender_loop(ws))
                     receiver = asyncio.create_task(self._receiver_loop(ws))
 
                     done, pending = await asyncio.wait(
                         {sender, receiver},
-                        return_when=asyncio.FIRST_EXCEPTION
+                        return_when=asyncio.FIRST_COMPLETED
                     )
 
                     for task in pending:
                         task.cancel()
+                    await asyncio.gather(*pending, return_exceptions=True)
+                    self._connected = False
 
             except Exception as e:
                 self._connected = False
                 self._last_err = repr(e)
                 await asyncio.sleep(0.6)
 
+    def _take(self, lane: str, limit: int) -> list:
+        q = self._lanes[lane]
+        now = time.monotonic()
+        out = []
+        while q and len(out) < limit:
+            item = q.popleft()
+            if item[3] < now:
+                self.expired += 1
+                continue
+            out.append(item)
+        return out
+
+    async def _next_batch(self) -> list:
+        """
+        Espera trabajo y junta lo pendiente: todo el control que haya (hasta
+        SEND_BATCH_MAX) o, si no hay control, un solo frame de audio, así una
+        emotion nunca queda detrás de varios TTS.
+        """
+        while not self._stop.is_set():
+            batch = self._take("control", SEND_BATCH_MAX) or self._take("bulk", 1)
+            if batch:
+                return batch
+            self._wake.clear()
+            await self._wake.wait()
+        return []
+
     async def _sender_loop(self, ws):
         while not self._stop.is_set():
-            try:
-                msg = self._q.get_nowait()
-            except Empty:
-                await asyncio.sleep(0.01)
-                continue
+            batch = await self._next_batch()
+            for i, (_, _, msg, _) in enumerate(batch):
+                try:
+                    if isinstance(msg, (bytes, str)):     # ya serializado
+                        await ws.send(msg)
+                    else:
+                        await ws.send(json.dumps(msg, ensure_ascii=False))
+                except (Exception, asyncio.CancelledError) as e:
+                    # lo no enviado sale primero al reconectar, en orden
+                    self._connected = False
+                    self._last_err = repr(e)
+                    self._requeue(batch[i:])
+                    raise
 
-            try:
-                await ws.send(json.dumps(msg, ensure_ascii=False))
-            except Exception as e:
-                # re-enqueue para no perderlo
-                self._connected = False
-                self._last_err = repr(e)
-                self._q.put(msg)
-                raise
+    def _on_control(self, raw: str):
+        try:
+            msg = json.loads(raw)
+        except Exception:
+            return
+        if msg.get("type") in ("state", "codecs") and isinstance(msg.get("codecs"), list):
+            if msg["codecs"] == self.codecs:
+                return
+            self.codecs = msg["codecs"]
+            if self.on_codecs is not None:
+                try:
+                    self.on_codecs(list(self.codecs))
+                except Exception as e:
+                    print("⚠️ on_codecs falló:", repr(e))
 
     async def _receiver_loop(self, ws):
-        # No usamos mensajes entrantes aquí, pero leer mantiene sano el socket
+        # Solo nos interesan los codecs (state / codecs); leer mantiene sano el socket
         try:
-            async for _ in ws:
+            async for raw in ws:
                 if self._stop.is_set():
                     break
+                if isinstance(raw, str) and len(raw) < 4096:
+                    self._on_control(raw)
         except Exception as e:
             self._connected = False
             self._last_err = repr(e)
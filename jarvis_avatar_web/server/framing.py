@@ -0,0 +1,113 @@
+import json
+import re
+import struct
+
+# Frame binario del WS del avatar (audio sin base64):
+#   u32 big-endian = largo del header | header JSON utf-8 | bytes crudos (WAV, ...)
+# Los mensajes de texto siguen siendo JSON normal.
+_LEN = struct.Struct(">I")
+
+# Audio troceado: un frame grande (binario o texto) viaja como varios frames
+# binarios {"type", "frag": id, "i", "n", "size", "text"} + pedazo, para que
+# mouse / emotion puedan ir intercalados. El avatar junta los pedazos en orden
+# y obtiene el frame original.
+FRAME_CHUNK_BYTES = 64 * 1024
+
+# Frames de texto: si "type" es la primera clave basta mirar el prefijo.
+# Los frames chicos (emotion, mouse, hello...) se parsean enteros; los grandes
+# (tts con base64) solo se miran por el tipo y se reenvían sin tocar.
+PEEK_FULL_PARSE_MAX = 4096
+_TYPE_PREFIX = re.compile(r'\s*\{\s*"type"\s*:\s*"([A-Za-z0-9_]{1,32})"')
+
+
+def encode_binary(header: dict, payload: bytes) -> bytes:
+    head = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return b"".join((_LEN.pack(len(head)), head, payload))
+
+
+def decode_header(frame: bytes) -> dict:
+    """Solo el header JSON (no copia el payload)."""
+    if len(frame) < _LEN.size:
+        raise ValueError("frame binario demasiado corto")
+    (n,) = _LEN.unpack_from(frame, 0)
+    end = _LEN.size + n
+    if end > len(frame):
+        raise ValueError("header binario truncado")
+    header = json.loads(bytes(memoryview(frame)[_LEN.size:end]))
+    if not isinstance(header, dict):
+        raise ValueError("header binario no es un objeto")
+    return header
+
+
+def decode_binary(frame: bytes) -> tuple:
+    """(header, payload)."""
+    header = decode_header(frame)
+    (n,) = _LEN.unpack_from(frame, 0)
+    return header, frame[_LEN.size + n:]
+
+
+def peek_envelope(raw: str, full_types=()) -> dict:
+    """
+    Sobre de un frame de texto sin parsear el cuerpo si es grande:
+    {"type": ...} si el tipo está al inicio, o el JSON completo si es chico,
+    si el tipo está en full_types (el hub necesita sus campos) o si no hay
+    otra. ValueError si no es un objeto JSON.
+    """
+    if len(raw) > PEEK_FULL_PARSE_MAX:
+        m = _TYPE_PREFIX.match(raw, 0, 128)
+        if m and m.group(1) not in full_types:
+            return {"type": m.group(1)}
+    msg = json.loads(raw)
+    if not isinstance(msg, dict):
+        raise ValueError("frame de texto no es un objeto")
+    return msg
+
+
+def stamp_seq(frame, seq: int):
+    """
+    Agrega "seq" como última clave del objeto sin parsear el resto (si el
+    productor mandó su propio "seq", al parsear gana el del hub). En binario
+    solo se reescribe el header; el payload se copia tal cual. Es una copia
+    del frame: el hub solo lo usa con frames de hasta FRAME_CHUNK_BYTES (lo
+    más grande lo trocea con split_frame, que ya numera cada pedazo).
+    """
+    if isinstance(frame, str):
+        j = frame.rindex("}")
+        sep = "" if frame[:j].rstrip().endswith("{") else ","
+        return f'{frame[:j]}{sep}"seq":{seq}' + frame[j:]
+
+    (n,) = _LEN.unpack_from(frame, 0)
+    head = bytes(memoryview(frame)[_LEN.size:_LEN.size + n])
+    j = head.rindex(b"}")
+    sep = b"" if head[:j].rstrip().endswith(b"{") else b","
+    head = head[:j] + sep + b'"seq":%d' % seq + head[j:]
+    return b"".join((_LEN.pack(len(head)), head, memoryview(frame)[_LEN.size + n:]))
+
+
+def split_frame(frame, frag_id: str, mtype: str = "tts", chunk_bytes: int = FRAME_CHUNK_BYTES,
+                first_seq: int = None) -> list:
+    """
+    Trocea un frame (bytes o str JSON) en frames binarios de chunk_bytes.
+    Con first_seq cada pedazo sale ya numerado (first_seq, first_seq + 1...).
+    """
+    text = isinstance(frame, str)
+    data = memoryview(frame.encode("utf-8") if text else frame)
+    n = max(1, -(-len(data) // chunk_bytes))
+    parts = []
+    for i in range(n):
+        header = {"type": mtype, "frag": frag_id, "i": i, "n": n, "size": len(data), "text": text}
+        if first_seq is not None:
+            header["seq"] = first_seq + i
+        parts.append(encode_binary(header, data[i * chunk_bytes:(i + 1) * chunk_bytes]))
+    return parts
+
+
+def join_frames(parts) -> object:
+    """Inverso de split_frame (pedazos en orden): el frame original."""
+    header = None
+    chunks = []
+    for part in parts:
+        header, payload = decode_binary(part)
+        chunks.append(payload)
+    data = b"".join(chunks)
+    return data.decode("utf-8") if header and header.get("text") else data
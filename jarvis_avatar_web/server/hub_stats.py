@@ -0,0 +1,177 @@
+import time
+from bisect import bisect_left
+
+# Métricas del hub. Todo se registra desde el loop asyncio (un solo hilo),
+# así que no hay locks: cada registro es un par de sumas en dicts / listas.
+# Las tasas por segundo salen del último segundo completo.
+
+# Límites de los buckets del histograma de broadcast (ms)
+BROADCAST_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50)
+
+
+class Histogram:
+    def __init__(self, bounds=BROADCAST_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)   # el último es +Inf
+        self.sum = 0.0
+        self.n = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.n += 1
+
+    def quantile(self, q: float) -> float:
+        """Aproximado: límite superior del bucket donde cae q."""
+        if not self.n:
+            return 0.0
+        target = q * self.n
+        acc = 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if acc >= target:
+                return self.bounds[i] if i < len(self.bounds) else float("inf")
+        return float("inf")
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.n,
+            "avg_ms": round(self.sum / self.n, 4) if self.n else 0.0,
+            "p50_ms": self.quantile(0.50),
+            "p99_ms": self.quantile(0.99),
+        }
+
+
+class _Rate:
+    """Mensajes / bytes por tipo: totales + los del último segundo completo."""
+
+    def __init__(self):
+        self.total = {}         # tipo -> [msgs, bytes]
+        self._cur = {}
+        self._last = {}
+        self._sec = int(time.monotonic())
+
+    def add(self, mtype, nbytes: int):
+        sec = int(time.monotonic())
+        if sec != self._sec:
+            self._roll(sec)
+        # Tipos raros (no identificadores) van juntos: acota etiquetas y cardinalidad
+        key = mtype if isinstance(mtype, str) and mtype.isidentifier() else "other"
+        t = self.total.get(key)
+        if t is None:
+            t = self.total[key] = [0, 0]
+        t[0] += 1
+        t[1] += nbytes
+        c = self._cur.setdefault(key, [0, 0])
+        c[0] += 1
+        c[1] += nbytes
+
+    def _roll(self, sec: int):
+        # Si pasó más de un segundo sin tráfico, el último segundo estuvo vacío
+        self._last = self._cur if sec == self._sec + 1 else {}
+        self._cur = {}
+        self._sec = sec
+
+    def per_second(self) -> dict:
+        sec = int(time.monotonic())
+        if sec != self._sec:
+            self._roll(sec)
+        return {k: {"msgs": v[0], "bytes": v[1]} for k, v in self._last.items()}
+
+    def totals(self) -> dict:
+        return {k: {"msgs": v[0], "bytes": v[1]} for k, v in self.total.items()}
+
+
+class HubStats:
+    def __init__(self):
+        self.started = time.time()
+        self.received = _Rate()     # lo que mandan los clientes
+        self.sent = _Rate()         # lo que el hub escribe a los sockets
+        self.broadcast = Histogram()
+
+        self.connects = 0
+        self.reconnects = 0         # hellos con "resume"
+        self.dead_clients = 0       # cerrados por error de envío o por lentos
+        self.dropped = 0            # frames tirados por colas llenas
+
+    # --- registro (hot path) ---
+    def on_receive(self, mtype, nbytes: int):
+        self.received.add(mtype, nbytes)
+
+    def on_send(self, mtype, nbytes: int):
+        self.sent.add(mtype, nbytes)
+
+    def on_broadcast(self, ms: float):
+        self.broadcast.observe(ms)
+
+    # --- lectura ---
+    def snapshot(self, conns=()) -> dict:
+        depths = [c.depth() for c in conns]
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "clients": len(depths),
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "dead_clients": self.dead_clients,
+            "dropped": self.dropped + sum(c.dropped for c in conns),
+            "queue_depth": {"max": max(depths, default=0), "total": sum(depths)},
+            "per_client": [
+                {
+                    "id": getattr(c, "id", str(i)),
+                    "role": getattr(c, "role", None),
+                    "peer": getattr(c, "peer", None),
+                    "depth": depth,
+                    "dropped": c.dropped,
+                }
+                for i, (c, depth) in enumerate(zip(conns, depths))
+            ],
+            "in_per_s": self.received.per_second(),
+            "out_per_s": self.sent.per_second(),
+            "in_total": self.received.totals(),
+            "out_total": self.sent.totals(),
+            "broadcast": self.broadcast.to_dict(),
+        }
+
+    def to_prometheus(self, conns=()) -> str:
+        """Formato de texto de Prometheus (counters + gauges + histograma)."""
+        snap = self.snapshot(conns)
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP jarvis_hub_{name} {help_text}")
+            lines.append(f"# TYPE jarvis_hub_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"jarvis_hub_{name}{labels} {value}")
+
+        metric("clients", "gauge", "Clientes conectados", [("", snap["clients"])])
+        metric("connects_total", "counter", "Conexiones aceptadas", [("", self.connects)])
+        metric("reconnects_total", "counter", "Reconexiones con resume", [("", self.reconnects)])
+        metric("dead_clients_total", "counter", "Clientes cerrados por error o lentitud", [("", self.dead_clients)])
+        metric("dropped_total", "counter", "Frames descartados por colas llenas", [("", snap["dropped"])])
+        metric("queue_depth_max", "gauge", "Mayor cola de envío entre clientes", [("", snap["queue_depth"]["max"])])
+        client_labels = [
+            (f'{{client="{c["id"]}",role="{c["role"] or "unknown"}"}}', c)
+            for c in snap["per_client"]
+        ]
+        metric("client_queue_depth", "gauge", "Cola de envío por cliente",
+               [(labels, c["depth"]) for labels, c in client_labels])
+        metric("client_dropped", "gauge", "Frames descartados por cliente (conexión actual)",
+               [(labels, c["dropped"]) for labels, c in client_labels])
+        for direction, label, rate in (("received", "recibidos", self.received), ("sent", "enviados", self.sent)):
+            totals = rate.totals()
+            metric(f"{direction}_messages_total", "counter", f"Mensajes {label} por tipo",
+                   [(f'{{type="{k}"}}', v["msgs"]) for k, v in totals.items()])
+            metric(f"{direction}_bytes_total", "counter", f"Bytes {label} por tipo",
+                   [(f'{{type="{k}"}}', v["bytes"]) for k, v in totals.items()])
+
+        h = self.broadcast
+        lines.append("# HELP jarvis_hub_broadcast_ms Duración de broadcast (ms)")
+        lines.append("# TYPE jarvis_hub_broadcast_ms histogram")
+        acc = 0
+        for bound, c in zip(h.bounds, h.counts):
+            acc += c
+            lines.append(f'jarvis_hub_broadcast_ms_bucket{{le="{bound}"}} {acc}')
+        lines.append(f'jarvis_hub_broadcast_ms_bucket{{le="+Inf"}} {h.n}')
+        lines.append(f"jarvis_hub_broadcast_ms_sum {h.sum}")
+        lines.append(f"jarvis_hub_broadcast_ms_count {h.n}")
+        return "\n".join(lines) + "\n"
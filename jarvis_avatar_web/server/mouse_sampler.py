@@ -0,0 +1,202 @@
+"""
+Muestreo del cursor compartido por los productores de mouse.
+
+En vez de mandar un frame "mouse" por tick aunque el cursor esté quieto:
+  - solo se manda si la posición normalizada se movió más que DEADBAND
+  - mientras hay movimiento se muestrea a ACTIVE_HZ; quieto baja a IDLE_HZ
+  - quieto, se repite la última posición cada HEARTBEAT_S (el hub no la pierde)
+
+La fuente del cursor es enchufable (pyautogui, win32, o una traza grabada
+para probar en Linux sin escritorio).
+
+Grabar una traza (para el benchmark):
+  python -m jarvis_avatar_web.server.mouse_sampler record traza.json --seconds 30
+"""
+import asyncio
+import json
+import sys
+import time
+
+DEADBAND = 0.004        # en NDC (-1..1): ~2 px en una ventana de 1000 px
+ACTIVE_HZ = 60
+IDLE_HZ = 10
+IDLE_AFTER_S = 0.5      # sin movimiento este tiempo -> ritmo idle
+HEARTBEAT_S = 1.0
+
+
+# -----------------------------
+# Fuentes de cursor
+# -----------------------------
+class CursorSource:
+    """position() -> (x, y) en píxeles de pantalla."""
+
+    def position(self) -> tuple:
+        raise NotImplementedError
+
+
+class PyAutoGUISource(CursorSource):
+    def __init__(self):
+        import pyautogui
+        self._pyautogui = pyautogui
+
+    def position(self) -> tuple:
+        x, y = self._pyautogui.position()
+        return x, y
+
+
+class Win32Source(CursorSource):
+    def __init__(self):
+        import win32api
+        self._win32api = win32api
+
+    def position(self) -> tuple:
+        return self._win32api.GetCursorPos()
+
+
+class TraceSource(CursorSource):
+    """
+    Reproduce una traza grabada [(t, x, y), ...] según el reloj que se le
+    pase (time.monotonic por default, o uno simulado en el benchmark).
+    """
+
+    def __init__(self, trace, clock=time.monotonic):
+        self.trace = [tuple(p) for p in trace]
+        self.clock = clock
+        self._t0 = None
+        self._i = 0
+
+    def position(self) -> tuple:
+        now = self.clock()
+        if self._t0 is None:
+            self._t0 = now - self.trace[0][0]
+        t = now - self._t0
+        while self._i + 1 < len(self.trace) and self.trace[self._i + 1][0] <= t:
+            self._i += 1
+        _, x, y = self.trace[self._i]
+        return x, y
+
+    def duration(self) -> float:
+        return self.trace[-1][0] - self.trace[0][0]
+
+
+# -----------------------------
+# Sampler
+# -----------------------------
+class MouseSampler:
+    """
+    normalize(x, y) -> (nx, ny) en -1..1, o None si ese punto no se manda
+    (p.ej. fuera del monitor del avatar).
+    """
+
+    def __init__(self, source: CursorSource, normalize, *, deadband: float = DEADBAND,
+                 active_hz: float = ACTIVE_HZ, idle_hz: float = IDLE_HZ,
+                 idle_after_s: float = IDLE_AFTER_S, heartbeat_s: float = HEARTBEAT_S,
+                 clock=time.monotonic):
+        self.source = source
+        self.normalize = normalize
+        self.deadband = deadband
+        self.active_dt = 1.0 / active_hz
+        self.idle_dt = 1.0 / idle_hz
+        self.idle_after_s = idle_after_s
+        self.heartbeat_s = heartbeat_s
+        self.clock = clock
+
+        self._last_sent = None
+        self._last_sent_t = 0.0
+        self._last_move_t = float("-inf")
+
+        self.samples = 0
+        self.sent = 0
+        self.heartbeats = 0
+
+    def _moved(self, pos) -> bool:
+        if self._last_sent is None:
+            return True
+        return (abs(pos[0] - self._last_sent[0]) > self.deadband
+                or abs(pos[1] - self._last_sent[1]) > self.deadband)
+
+    def step(self) -> tuple:
+        """
+        Una muestra: (posición a mandar o None, segundos hasta la próxima).
+        """
+        now = self.clock()
+        self.samples += 1
+        x, y = self.source.position()
+        pos = self.normalize(x, y)
+
+        out = None
+        if pos is not None:
+            if self._moved(pos):
+                self._last_move_t = now
+                out = pos
+            elif now - self._last_sent_t >= self.heartbeat_s:
+                self.heartbeats += 1
+                out = self._last_sent
+
+        if out is not None:
+            self._last_sent = out
+            self._last_sent_t = now
+            self.sent += 1
+
+        moving = now - self._last_move_t < self.idle_after_s
+        return out, (self.active_dt if moving else self.idle_dt)
+
+    def stats(self) -> dict:
+        return {"samples": self.samples, "sent": self.sent, "heartbeats": self.heartbeats}
+
+    async def run(self, ws):
+        """Muestrea y manda por ws hasta que se caiga la conexión."""
+        while True:
+            pos, delay = self.step()
+            if pos is not None:
+                await ws.send(json.dumps({"type": "mouse", "x": pos[0], "y": pos[1]}))
+            await asyncio.sleep(delay)
+
+
+# -----------------------------
+# Normalizadores
+# -----------------------------
+def clamp(v, a, b):
+    return a if v < a else b if v > b else v
+
+
+def rect_normalizer(left: int, top: int, width: int, height: int, outside=None):
+    """
+    Mapea el rect a -1..1 (y hacia arriba). Fuera del rect devuelve outside
+    (None = no mandar).
+    """
+    def normalize(x, y):
+        if not (left <= x <= left + width and top <= y <= top + height):
+            return outside
+        nx = ((x - left) / width) * 2 - 1
+        ny = -(((y - top) / height) * 2 - 1)
+        return clamp(nx, -1.0, 1.0), clamp(ny, -1.0, 1.0)
+    return normalize
+
+
+# -----------------------------
+# Grabación de trazas
+# -----------------------------
+def record(path: str, seconds: float, hz: float = 120.0):
+    try:
+        source = Win32Source()
+    except ImportError:
+        source = PyAutoGUISource()
+    trace = []
+    t0 = time.monotonic()
+    print(f"🎬 Grabando cursor {seconds:.0f} s -> {path}")
+    while (t := time.monotonic() - t0) < seconds:
+        x, y = source.position()
+        trace.append((round(t, 4), x, y))
+        time.sleep(1.0 / hz)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(trace, f)
+    print(f"✅ {len(trace)} muestras")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "record":
+        secs = float(sys.argv[sys.argv.index("--seconds") + 1]) if "--seconds" in sys.argv else 30.0
+        record(sys.argv[2], secs)
+    else:
+        print("Uso: python -m jarvis_avatar_web.server.mouse_sampler record <traza.json> [--seconds N]")
@@ -1,15 +1,22 @@
-import asyncio, json, time
+import asyncio, json
 import pyautogui
+from screeninfo import get_monitors
 import websockets
 
+try:
+    from jarvis_avatar_web.server.mouse_sampler import MouseSampler, PyAutoGUISource, rect_normalizer
+except ImportError:  # corriendo como script desde server/
+    from mouse_sampler import MouseSampler, PyAutoGUISource, rect_normalizer
+
 WS_URL = "ws://127.0.0.1:8765"
 
 async def run_once():
     async with websockets.connect(WS_URL) as ws:
-        while True:
-            x, y = pyautogui.position()
-            await ws.send(json.dumps({"type":"mouse","x":x,"y":y}))
-            await asyncio.sleep(1/30)
+        await ws.send(json.dumps({"type": "hello", "role": "producer", "subscribe": []}))
+        # Pantalla principal -> -1..1; solo se manda si el cursor se movió
+        w, h = pyautogui.size()
+        sampler = MouseSampler(PyAutoGUISource(), rect_normalizer(0, 0, w, h))
+        await sampler.run(ws)
 
 async def main():
     while True:
@@ -21,12 +28,7 @@ async def main():
 
 if __name__ == "__main__":
     asyncio.run(main())
-import asyncio, json, pyautogui
-from screeninfo import get_monitors
-import websockets
 
-WS_URL = "ws://127.0.0.1:8765"
-FPS = 60
 MONITOR_INDEX = 1   # 0 = principal, 1 = secundario (derecha)
 
 monitors = get_monitors()
@@ -34,23 +36,11 @@ MON = monitors[MONITOR_INDEX]
 
 async def main():
     async with websockets.connect(WS_URL) as ws:
+        await ws.send(json.dumps({"type": "hello", "role": "producer", "subscribe": []}))
         print(f"🖥️ Usando monitor {MONITOR_INDEX}: {MON.width}x{MON.height} at ({MON.x},{MON.y})")
 
-        while True:
-            x, y = pyautogui.position()
-
-            # ¿el mouse está dentro del monitor del avatar?
-            if MON.x <= x <= MON.x + MON.width and MON.y <= y <= MON.y + MON.height:
-                # normalizar a -1..1
-                nx = ((x - MON.x) / MON.width) * 2 - 1
-                ny = -(((y - MON.y) / MON.height) * 2 - 1)
-
-                await ws.send(json.dumps({
-                    "type": "mouse",
-                    "x": max(-1, min(1, nx)),
-                    "y": max(-1, min(1, ny))
-                }))
-
-            await asyncio.sleep(1 / FPS)
+        # Solo cuenta el mouse dentro del monitor del avatar (normalizado a -1..1)
+        sampler = MouseSampler(PyAutoGUISource(), rect_normalizer(MON.x, MON.y, MON.width, MON.height))
+        await sampler.run(ws)
 
 asyncio.run(main())
@@ -1,10 +1,15 @@
 import asyncio, json, time, ctypes
 import websockets
 import win32gui
-import win32api
+
+try:
+    from jarvis_avatar_web.server.mouse_sampler import MouseSampler, Win32Source
+    from jarvis_avatar_web.server.window_tracker import WindowBackend, WindowTracker
+except ImportError:  # corriendo como script desde server/
+    from mouse_sampler import MouseSampler, Win32Source
+    from window_tracker import WindowBackend, WindowTracker
 
 WS_URL = "ws://127.0.0.1:8765"
-FPS = 60
 AVATAR_TITLE_CONTAINS = "JARVIS_AVATAR__5f3c9e"
 
 
@@ -55,38 +60,32 @@ def get_window_rect_dwm(hwnd):
         return (L, T, R, B)
     return (rc.left, rc.top, rc.right, rc.bottom)
 
-def find_best_window_by_title_contains(substr: str):
-    substr = substr.lower()
-    best_hwnd = None
-    best_area = 0
-    best_title = ""
-
-    def enum_cb(hwnd, _):
-        nonlocal best_hwnd, best_area, best_title
+class Win32WindowBackend(WindowBackend):
+    def candidates(self, title_contains: str) -> list:
+        substr = title_contains.lower()
+        found = []
 
-        if not win32gui.IsWindowVisible(hwnd):
-            return
+        def enum_cb(hwnd, _):
+            if not win32gui.IsWindowVisible(hwnd):
+                return
+            title = (win32gui.GetWindowText(hwnd) or "").strip()
+            if title and substr in title.lower():
+                found.append((hwnd, title))
 
-        title = (win32gui.GetWindowText(hwnd) or "").strip()
-        if not title:
-            return
-        if substr not in title.lower():
-            return
+        win32gui.EnumWindows(enum_cb, None)
+        return found
 
-        L, T, R, B = get_window_rect_dwm(hwnd)
-        w = max(0, R - L)
-        h = max(0, B - T)
-        area = w * h
-        if area < 200 * 200:
-            return
+    def is_alive(self, hwnd) -> bool:
+        return bool(win32gui.IsWindow(hwnd)) and bool(win32gui.IsWindowVisible(hwnd))
 
-        if area > best_area:
-            best_area = area
-            best_hwnd = hwnd
-            best_title = title
+    def title(self, hwnd) -> str:
+        return (win32gui.GetWindowText(hwnd) or "").strip()
 
-    win32gui.EnumWindows(enum_cb, None)
-    return best_hwnd, best_title
+    def rect(self, hwnd) -> tuple:
+        try:
+            return get_window_rect_dwm(hwnd)
+        except Exception:
+            return None
 
 def normalize_mouse_relative_to_window_center(mouse_pt, rc):
     mx, my = mouse_pt
@@ -108,46 +107,51 @@ def normalize_mouse_relative_to_window_center(mouse_pt, rc):
     ny = -dy / ry
     return clamp(nx, -1.0, 1.0), clamp(ny, -1.0, 1.0)
 
-async def connect_and_stream():
-    set_dpi_awareness()
-
+def make_window_normalizer(tracker: WindowTracker):
+    """normalize(x, y) del sampler: relativo al centro de la ventana del avatar."""
     last_hwnd = None
     last_rect = None
     last_dbg = 0.0
-    tick = 1.0 / FPS
+
+    def normalize(cx, cy):
+        nonlocal last_hwnd, last_rect, last_dbg
+        found = tracker.get()
+        if found is None:
+            return IDLE_NDC
+        hwnd, title, rc = found
+
+        if hwnd != last_hwnd:
+            last_hwnd = hwnd
+            print("🎭 Ventana avatar encontrada:", title)
+
+        if rc != last_rect:
+            last_rect = rc
+            print("🧩 Rect(DWM) avatar:", rc)
+
+        nx, ny = normalize_mouse_relative_to_window_center((cx, cy), rc)
+
+        now = time.time()
+        if now - last_dbg > 3.0:
+            print(f"🖱️ cursor=({cx},{cy}) rect={rc} ndc=({nx:.3f},{ny:.3f})")
+            last_dbg = now
+        return nx, ny
+
+    return normalize
+
+async def connect_and_stream():
+    set_dpi_awareness()
+    # La ventana se busca una vez y se revalida barato (no EnumWindows por frame)
+    normalize = make_window_normalizer(WindowTracker(AVATAR_TITLE_CONTAINS, Win32WindowBackend()))
 
     while True:
         try:
             async with websockets.connect(WS_URL, ping_interval=20, ping_timeout=20) as ws:
                 print("✅ mouse_stream_auto conectado:", WS_URL)
+                await ws.send(json.dumps({"type": "hello", "role": "producer", "subscribe": []}, ensure_ascii=False))
 
-                while True:
-                    hwnd, title = find_best_window_by_title_contains(AVATAR_TITLE_CONTAINS)
-                    if hwnd is None:
-                        await ws.send(json.dumps({"type": "mouse", "x": IDLE_NDC[0], "y": IDLE_NDC[1]}, ensure_ascii=False))
-                        await asyncio.sleep(0.25)
-                        continue
-
-                    if hwnd != last_hwnd:
-                        last_hwnd = hwnd
-                        print("🎭 Ventana avatar encontrada:", title)
-
-                    rc = get_window_rect_dwm(hwnd)
-                    if rc != last_rect:
-                        last_rect = rc
-                        print("🧩 Rect(DWM) avatar:", rc)
-
-                    cx, cy = win32api.GetCursorPos()
-                    nx, ny = normalize_mouse_relative_to_window_center((cx, cy), rc)
-
-                    now = time.time()
-                    if now - last_dbg > 3.0:
-                        L, T, R, B = rc
-                        print(f"🖱️ cursor=({cx},{cy}) rect={rc} ndc=({nx:.3f},{ny:.3f})")
-                        last_dbg = now
-
-                    await ws.send(json.dumps({"type": "mouse", "x": nx, "y": ny}, ensure_ascii=False))
-                    await asyncio.sleep(tick)
+                # Sin ventana -> IDLE_NDC; el sampler solo manda cambios (+ heartbeat)
+                sampler = MouseSampler(Win32Source(), normalize)
+                await sampler.run(ws)
 
         except Exception as e:
             print("❌ WS error / desconectado:", repr(e))
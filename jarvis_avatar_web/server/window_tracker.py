@@ -0,0 +1,133 @@
+"""
+Seguimiento de la ventana del avatar sin recorrer todas las ventanas por frame.
+
+Se busca la ventana una vez (la de mayor área cuyo título contiene el texto)
+y se guarda hwnd + rect. Cada REVALIDATE_S se revalida barato (¿sigue
+existiendo, visible, con ese título? + rect nuevo). Solo si eso falla se
+vuelve a escanear, y sin ventana el reescaneo se limita a RESCAN_S.
+
+La plataforma va detrás de un backend inyectable (Win32 en
+mouse_stream_auto.py; FakeWindowBackend para probar con una lista fija).
+"""
+import time
+
+REVALIDATE_S = 0.2
+RESCAN_S = 0.5
+MIN_AREA = 200 * 200
+
+
+class WindowBackend:
+    def candidates(self, title_contains: str) -> list:
+        """[(hwnd, título)] de ventanas visibles cuyo título contiene el texto."""
+        raise NotImplementedError
+
+    def is_alive(self, hwnd) -> bool:
+        """La ventana sigue existiendo y visible."""
+        raise NotImplementedError
+
+    def title(self, hwnd) -> str:
+        raise NotImplementedError
+
+    def rect(self, hwnd) -> tuple:
+        """(left, top, right, bottom) o None."""
+        raise NotImplementedError
+
+
+class FakeWindowBackend(WindowBackend):
+    """Lista de ventanas en memoria: {hwnd: (título, rect)}."""
+
+    def __init__(self, windows: dict = None):
+        self.windows = dict(windows or {})
+        self.scans = 0
+        self.rect_calls = 0
+
+    def candidates(self, title_contains: str) -> list:
+        self.scans += 1
+        needle = title_contains.lower()
+        return [(h, t) for h, (t, _) in self.windows.items() if needle in t.lower()]
+
+    def is_alive(self, hwnd) -> bool:
+        return hwnd in self.windows
+
+    def title(self, hwnd) -> str:
+        return self.windows[hwnd][0] if hwnd in self.windows else ""
+
+    def rect(self, hwnd) -> tuple:
+        self.rect_calls += 1
+        return self.windows[hwnd][1] if hwnd in self.windows else None
+
+
+def _area(rc) -> int:
+    L, T, R, B = rc
+    return max(0, R - L) * max(0, B - T)
+
+
+class WindowTracker:
+    def __init__(self, title_contains: str, backend: WindowBackend, *,
+                 revalidate_s: float = REVALIDATE_S, rescan_s: float = RESCAN_S,
+                 min_area: int = MIN_AREA, clock=time.monotonic):
+        self.title_contains = title_contains
+        self.backend = backend
+        self.revalidate_s = revalidate_s
+        self.rescan_s = rescan_s
+        self.min_area = min_area
+        self.clock = clock
+
+        self.hwnd = None
+        self.title = ""
+        self.rc = None
+        self._checked_at = float("-inf")
+        self._scanned_at = float("-inf")
+
+        self.scans = 0
+        self.revalidations = 0
+
+    def invalidate(self):
+        self.hwnd = None
+        self.rc = None
+
+    def _scan(self, now: float):
+        self._scanned_at = now
+        self.scans += 1
+        best = None
+        best_area = 0
+        for hwnd, title in self.backend.candidates(self.title_contains):
+            rc = self.backend.rect(hwnd)
+            if rc is None:
+                continue
+            area = _area(rc)
+            if area >= self.min_area and area > best_area:
+                best, best_area = (hwnd, title, rc), area
+        if best is None:
+            self.invalidate()
+        else:
+            self.hwnd, self.title, self.rc = best
+        self._checked_at = now
+
+    def _revalidate(self, now: float) -> bool:
+        self.revalidations += 1
+        self._checked_at = now
+        hwnd = self.hwnd
+        if not self.backend.is_alive(hwnd):
+            return False
+        if self.title_contains.lower() not in self.backend.title(hwnd).lower():
+            return False        # el hwnd se reutilizó para otra ventana
+        rc = self.backend.rect(hwnd)
+        if rc is None or _area(rc) < self.min_area:
+            return False
+        self.rc = rc
+        return True
+
+    def get(self) -> tuple:
+        """(hwnd, título, rect) de la ventana del avatar, o None si no está."""
+        now = self.clock()
+        if self.hwnd is not None:
+            if now - self._checked_at < self.revalidate_s or self._revalidate(now):
+                return self.hwnd, self.title, self.rc
+            self.invalidate()
+            self._scanned_at = float("-inf")     # se perdió: reescanear ya
+        if now - self._scanned_at >= self.rescan_s:
+            self._scan(now)
+        if self.hwnd is None:
+            return None
+        return self.hwnd, self.title, self.rc
@@ -1,10 +1,86 @@
-import asyncio, json, traceback, time
+import asyncio, itertools, json, traceback, time, uuid
+from collections import deque
 import websockets
 
+try:
+    from jarvis_avatar_web.server.framing import (
+        FRAME_CHUNK_BYTES, decode_header, peek_envelope, split_frame, stamp_seq,
+    )
+    from jarvis_avatar_web.server.hub_stats import HubStats
+except ImportError:  # corriendo como script desde server/
+    from framing import FRAME_CHUNK_BYTES, decode_header, peek_envelope, split_frame, stamp_seq
+    from hub_stats import HubStats
+
 HOST = "127.0.0.1"
 PORT = 8765
 
-clients: set = set()
+# Métricas: siempre se registran (baratas); {"type": "stats"} las pide por WS.
+# Con un puerto acá también se sirven en http://HOST:puerto/metrics (Prometheus).
+METRICS_HTTP_PORT = 0      # 0 = apagado
+stats = HubStats()
+
+# Cola de salida por cliente: broadcast solo encola; cada cliente tiene su writer.
+# Si un cliente lento llena su cola:
+#   drop_oldest -> se tira el mensaje más viejo
+#   conflate    -> se reemplaza el pendiente del mismo tipo (mouse, emotion...) o el más viejo
+#   disconnect  -> se cierra ese cliente
+SEND_QUEUE_MAX = 64
+SLOW_CLIENT_POLICY = "drop_oldest"
+SLOW_CLIENT_POLICIES = ("drop_oldest", "conflate", "disconnect")
+
+# El audio va por su propio carril (acotado en bytes) y en pedazos de
+# FRAME_CHUNK_BYTES: el writer siempre manda antes lo de tiempo real, así
+# mouse / emotion se intercalan entre pedazos de TTS. El hub trocea lo que le
+# llegue entero.
+BULK_TYPES = ("tts",)
+SEND_BULK_MAX_BYTES = 16 * 1024 * 1024
+_frag_ids = itertools.count(1)
+_client_ids = itertools.count(1)
+
+clients: dict = {}      # ws -> ClientConn
+
+# Suscripciones por tipo de mensaje. Cada cliente declara en su hello qué
+# consume ("subscribe"). Hasta el hello no recibe nada; si no lo manda
+# (pasado HELLO_WAIT_S o si manda otra cosa primero) recibe todo (compat).
+# Nunca se hace eco al que mandó el mensaje.
+TOPICS = ("mouse", "emotion", "say", "tts", "state", "codecs")
+PRODUCER_TOPICS = ("codecs",)
+subscribers: dict = {t: set() for t in TOPICS}
+wildcard: set = set()   # suscritos a todo (también tipos desconocidos)
+
+# Mouse: canal conflado. Cada muestra solo actualiza state["mouse"]; el hub
+# manda el último valor una vez por tick y solo a quien quiere mouse.
+MOUSE_TICK_HZ = 30
+_mouse_dirty = False
+_mouse_task = None
+
+# Tipos cuyo cuerpo el hub sí lee (estado / handshake); el resto se reenvía crudo
+STATEFUL_TYPES = ("emotion", "mouse", "hello")
+
+# Replay: cada mensaje reenviado lleva "seq" creciente y queda en un anillo
+# acotado (frames y bytes). Un cliente que reconecta manda en su hello
+# {"hub": id, "resume": último seq visto} y recibe solo lo que se perdió; si
+# se quedó muy atrás (o el hub reinició) le basta el snapshot de estado.
+# Lo que ya va en el snapshot (mouse, emotion, codecs) no entra: reenviarlo
+# pisaría el estado actual con uno viejo.
+# Ningún frame numerado pasa de FRAME_CHUNK_BYTES: lo más grande se trocea y
+# cada pedazo sale numerado desde split_frame, sin copiar el frame otra vez.
+SNAPSHOT_TYPES = ("mouse", "emotion", "codecs", "state", "stats")
+REPLAY_MAX_FRAMES = 512
+REPLAY_MAX_BYTES = 8 * 1024 * 1024
+REPLAY_MAX_RESUME = 256     # más de esto perdido -> solo snapshot
+# Lo en vivo queda en la cola del cliente hasta procesar su hello, así el
+# replay sale antes; un cliente que nunca manda hello (o manda otra cosa
+# primero) empieza a recibir igual pasado HELLO_WAIT_S.
+HELLO_WAIT_S = 0.3
+HUB_ID = uuid.uuid4().hex[:12]
+_seq = 0
+replay_ring = deque()       # (seq, tipo, frame, bytes)
+_replay_bytes = 0
+
+# Codecs que anuncia cada avatar en su "hello" (ws -> lista)
+CODEC_ORDER = ["opus", "mp3", "wav"]
+client_codecs: dict = {}
 
 state = {
     "emotion": "neutral",
@@ -25,29 +101,299 @@ async def safe_send(ws, msg: str) -> bool:
     except Exception:
         return False
 
-async def broadcast(obj: dict):
-    if not clients:
+
+def _peer(ws) -> str:
+    addr = getattr(ws, "remote_address", None)
+    if isinstance(addr, (tuple, list)) and len(addr) >= 2:
+        return f"{addr[0]}:{addr[1]}"
+    return str(addr) if addr else "?"
+
+
+class ClientConn:
+    """Cola acotada + tarea writer de un cliente conectado."""
+
+    def __init__(self, ws, maxlen: int = SEND_QUEUE_MAX, policy: str = SLOW_CLIENT_POLICY):
+        self.ws = ws
+        self.id = f"c{next(_client_ids)}"
+        self.role = None        # lo que diga su hello ("avatar", "producer"...)
+        self.peer = _peer(ws)
+        self.maxlen = maxlen
+        self.policy = policy
+        self.dropped = 0
+        self.closed = False
+        self.topics = set()     # None = todo; vacío hasta el hello
+        self.hello = False
+        self.joined_seq = _seq  # al suscribirse; lo posterior le llega en vivo
+
+        self._q = deque()          # (tipo, frame) de tiempo real
+        self._bulk = deque()       # (tipo, frame) de audio
+        self._bulk_bytes = 0
+        self._wake = asyncio.Event()
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._writer())
+
+    def depth(self) -> int:
+        return len(self._q) + len(self._bulk)
+
+    def enqueue(self, frame, mtype=None):
+        if self.closed:
+            return
+        if mtype in BULK_TYPES:
+            self._enqueue_bulk(frame, mtype)
+            return
+        if len(self._q) >= self.maxlen:
+            if self.policy == "disconnect":
+                self.close(dead=True)
+                return
+            if self.policy == "conflate" and mtype is not None:
+                for i, (queued_type, _) in enumerate(self._q):
+                    if queued_type == mtype:
+                        del self._q[i]
+                        break
+                else:
+                    self._q.popleft()
+            else:
+                self._q.popleft()
+            self.dropped += 1
+
+        self._q.append((mtype, frame))
+        self._wake.set()
+
+    def enqueue_front(self, frames):
+        """
+        Replay: (tipo, frame) en orden, antes de lo que ya estaba encolado
+        (salvo el snapshot de estado, que sigue yendo primero).
+        """
+        if self.closed:
+            return
+        head = []
+        while self._q and self._q[0][0] == "state":
+            head.append(self._q.popleft())
+        for mtype, frame in reversed(frames):
+            if mtype in BULK_TYPES:
+                self._bulk.appendleft((mtype, frame))
+                self._bulk_bytes += len(frame)
+            else:
+                self._q.appendleft((mtype, frame))
+        self._q.extendleft(reversed(head))
+        self._wake.set()
+
+    def ready(self):
+        """
+        Hello procesado (o no va a llegar): el writer puede empezar. Sin
+        hello (cliente viejo) recién acá se suscribe a todo.
+        """
+        if self._ready.is_set():
+            return
+        if not self.hello:
+            subscribe(self, None)
+            self.joined_seq = _seq
+            send_full_state(self.ws)
+        self._ready.set()
+
+    def _enqueue_bulk(self, frame, mtype):
+        self._bulk.append((mtype, frame))
+        self._bulk_bytes += len(frame)
+        while self._bulk_bytes > SEND_BULK_MAX_BYTES and len(self._bulk) > 1:
+            if self.policy == "disconnect":
+                self.close(dead=True)
+                return
+            self._bulk_bytes -= len(self._bulk.popleft()[1])
+            self.dropped += 1
+        self._wake.set()
+
+    def close(self, dead: bool = False):
+        """dead=True: lo cerramos nosotros (envío falló o era muy lento)."""
+        if self.closed:
+            return
+        self.closed = True
+        stats.dropped += self.dropped
+        self.dropped = 0
+        if dead:
+            stats.dead_clients += 1
+        self._q.clear()
+        self._bulk.clear()
+        self._task.cancel()
+        unsubscribe(self)
+        clients.pop(self.ws, None)
+        asyncio.ensure_future(self.ws.close())
+
+    async def _writer(self):
+        try:
+            await asyncio.wait_for(self._ready.wait(), HELLO_WAIT_S)
+        except asyncio.TimeoutError:
+            self.ready()
+        while True:
+            if self._q:
+                mtype, frame = self._q.popleft()
+            elif self._bulk:
+                mtype, frame = self._bulk.popleft()
+                self._bulk_bytes -= len(frame)
+            else:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            if not await safe_send(self.ws, frame):
+                self.close(dead=True)
+                return
+            stats.on_send(mtype, len(frame))
+
+
+def subscribe(conn: ClientConn, topics=None):
+    """topics=None -> todo; si no, solo esos tipos."""
+    unsubscribe(conn)
+    if topics is None:
+        conn.topics = None
+        wildcard.add(conn)
+        for subs in subscribers.values():
+            subs.add(conn)
         return
-    msg = dumps(obj)
-    dead = []
-    for ws in list(clients):
-        ok = await safe_send(ws, msg)
-        if not ok:
-            dead.append(ws)
-    for ws in dead:
-        clients.discard(ws)
-
-async def send_full_state(ws):
+    conn.topics = {t for t in topics if t in subscribers}
+    for t in conn.topics:
+        subscribers[t].add(conn)
+
+def unsubscribe(conn: ClientConn):
+    wildcard.discard(conn)
+    for subs in subscribers.values():
+        subs.discard(conn)
+
+def route(mtype) -> set:
+    return subscribers.get(mtype, wildcard)
+
+def next_seqs(n: int = 1) -> int:
+    """Reserva n seq seguidos; devuelve el primero."""
+    global _seq
+    _seq += n
+    return _seq - n + 1
+
+def remember(seq: int, msg, mtype=None):
+    """Guarda un frame ya numerado en el anillo de replay."""
+    global _replay_bytes
+    size = len(msg)
+    replay_ring.append((seq, mtype, msg, size))
+    _replay_bytes += size
+    while replay_ring and (len(replay_ring) > REPLAY_MAX_FRAMES or _replay_bytes > REPLAY_MAX_BYTES):
+        _replay_bytes -= replay_ring.popleft()[3]
+
+def can_replay(conn: ClientConn, hub_id, last_seq) -> bool:
+    """False si no se puede (otro hub, muy atrás o ya fuera del anillo)."""
+    if hub_id != HUB_ID or not isinstance(last_seq, int):
+        return False
+    upto = conn.joined_seq
+    if last_seq >= upto:
+        return True
+    oldest = replay_ring[0][0] if replay_ring else upto + 1
+    return upto - last_seq <= REPLAY_MAX_RESUME and last_seq + 1 >= oldest
+
+def replay_to(conn: ClientConn, last_seq):
+    """
+    Reencola lo que el cliente se perdió entre last_seq y que se suscribió,
+    delante de lo que ya tenga encolado (salvo el snapshot). Antes: can_replay.
+    """
+    upto = conn.joined_seq
+    conn.enqueue_front([
+        (mtype, frame) for seq, mtype, frame, _ in replay_ring
+        if last_seq < seq <= upto and conn in route(mtype)
+    ])
+
+async def broadcast(obj: dict, exclude=None, replay=True):
+    await broadcast_frame(dumps(obj), obj.get("type"), exclude, replay)
+
+async def broadcast_frame(msg, mtype=None, exclude=None, replay=True, seq=None):
+    """
+    Reenvía un frame ya serializado (str JSON o bytes binarios) tal cual,
+    solo a los suscritos a su tipo y nunca al que lo mandó (exclude).
+    Con replay=True le agrega "seq" y lo guarda para reconexiones; si el
+    frame ya viene numerado (pedazos del hub) se pasa su seq.
+    No espera a ningún socket: solo encola en cada cliente.
+    """
+    t0 = time.perf_counter()
+    if seq is None and replay and mtype not in SNAPSHOT_TYPES:
+        seq = next_seqs()
+        msg = stamp_seq(msg, seq)
+    if seq is not None:
+        remember(seq, msg, mtype)
+    for conn in list(route(mtype)):
+        if conn is not exclude:
+            conn.enqueue(msg, mtype)
+    stats.on_broadcast((time.perf_counter() - t0) * 1000)
+
+async def relay(raw, msg: dict, sender=None):
+    """
+    Reenvía lo que mandó un cliente. Si es grande y llegó entero, lo trocea
+    antes del fan-out (cada pedazo ya numerado); si ya viene troceado (o es
+    chico) va tal cual.
+    """
+    mtype = msg.get("type")
+    if "frag" not in msg and len(raw) > FRAME_CHUNK_BYTES:
+        numbered = mtype not in SNAPSHOT_TYPES
+        first = _seq + 1 if numbered else None
+        parts = split_frame(raw, f"h{next(_frag_ids)}", mtype, first_seq=first)
+        if numbered:
+            next_seqs(len(parts))
+        for i, part in enumerate(parts):
+            await broadcast_frame(part, mtype, exclude=sender, replay=numbered,
+                                  seq=first + i if numbered else None)
+        return
+    await broadcast_frame(raw, mtype, exclude=sender)
+
+def mark_mouse_dirty():
+    global _mouse_dirty
+    _mouse_dirty = True
+
+async def mouse_tick_loop():
+    """Fan-out del mouse a ritmo fijo (MOUSE_TICK_HZ), solo si cambió."""
+    global _mouse_dirty
+    while True:
+        await asyncio.sleep(1.0 / MOUSE_TICK_HZ)
+        if not _mouse_dirty:
+            continue
+        _mouse_dirty = False
+
+        m = state["mouse"]
+        frame = dumps({"type": "mouse", "x": m["x"], "y": m["y"]})
+        for conn in list(subscribers["mouse"]):
+            conn.enqueue(frame, "mouse")
+
+def ensure_mouse_ticker():
+    global _mouse_task
+    if _mouse_task is None or _mouse_task.done():
+        _mouse_task = asyncio.create_task(mouse_tick_loop())
+
+def common_codecs() -> list:
+    """Codecs que pueden decodificar TODOS los avatares conectados."""
+    if not client_codecs:
+        return []
+    common = set(CODEC_ORDER)
+    for codecs in client_codecs.values():
+        common &= set(codecs)
+    return [c for c in CODEC_ORDER if c in common]
+
+async def set_client_codecs(ws, codecs):
+    if codecs is None:
+        client_codecs.pop(ws, None)
+    else:
+        client_codecs[ws] = [c for c in codecs if isinstance(c, str)]
+    await broadcast({"type": "codecs", "codecs": common_codecs()}, replay=False)
+
+def send_full_state(ws, resync=False):
     payload = {
         "type": "state",
+        "hub": HUB_ID,
+        "resync": resync,
+        "codecs": common_codecs(),
         "emotion": state["emotion"],
         "mouse": state["mouse"],
         "updated_at": state["updated_at"],
     }
-    await safe_send(ws, dumps(payload))
+    conn = clients.get(ws)
+    if conn is not None:
+        conn.enqueue(dumps(payload), "state")
 
-def apply_state_update(msg: dict):
+def apply_state_update(msg: dict) -> bool:
+    """Aplica emotion / mouse al estado. True si el mouse cambió de valor."""
     changed = False
+    mouse_moved = False
 
     if msg.get("type") == "emotion" and isinstance(msg.get("emotion"), str):
         state["emotion"] = msg["emotion"]
@@ -59,31 +405,115 @@ def apply_state_update(msg: dict):
         if isinstance(x, (int, float)) and isinstance(y, (int, float)):
             x = max(-1.0, min(1.0, float(x)))
             y = max(-1.0, min(1.0, float(y)))
-            state["mouse"] = {"x": x, "y": y}
-            changed = True
+            if state["mouse"] != {"x": x, "y": y}:
+                state["mouse"] = {"x": x, "y": y}
+                changed = mouse_moved = True
 
     if changed:
         state["updated_at"] = now()
+    return mouse_moved
 
 async def handle_ws(ws):
-    clients.add(ws)
+    ensure_mouse_ticker()
+    # Sin suscripciones hasta el hello: a un productor no se le encola nada
+    conn = clients[ws] = ClientConn(ws)
+    stats.connects += 1
     try:
-        await send_full_state(ws)
-
         async for raw in ws:
+            if isinstance(raw, bytes):
+                # Frame binario (audio): solo leemos el header, el resto se reenvía igual
+                try:
+                    msg = decode_header(raw)
+                except Exception:
+                    continue
+                stats.on_receive(msg.get("type"), len(raw))
+                conn.ready()
+                apply_state_update(msg)
+                await relay(raw, msg, conn)
+                continue
+
+            # Solo el sobre: los frames grandes (tts base64) no se parsean ni
+            # se vuelven a serializar, se reenvía el texto original.
             try:
-                msg = json.loads(raw)
+                msg = peek_envelope(raw, STATEFUL_TYPES)
             except Exception:
                 continue
+            stats.on_receive(msg.get("type"), len(raw))
+            if msg.get("type") != "hello":
+                conn.ready()
+
+            # Pedido de métricas: se contesta solo a quien pregunta
+            if msg.get("type") == "stats":
+                snap = stats.snapshot(list(clients.values()))
+                conn.enqueue(dumps({"type": "stats", **snap}), "stats")
+                continue
 
-            apply_state_update(msg)
-            await broadcast(msg)
+            # Handshake del avatar: qué audio sabe decodificar (no se reenvía)
+            if msg.get("type") == "hello":
+                role = msg.get("role")
+                if isinstance(role, str) and role.isidentifier():
+                    conn.role = role[:32]
+                if isinstance(msg.get("subscribe"), list):
+                    subscribe(conn, msg["subscribe"])
+                elif msg.get("role") == "producer":
+                    subscribe(conn, PRODUCER_TOPICS)
+                else:
+                    subscribe(conn, None)
+                conn.hello = True
+                if msg.get("policy") in SLOW_CLIENT_POLICIES:
+                    conn.policy = msg["policy"]
+                codecs = msg.get("codecs")
+                if isinstance(codecs, list):
+                    await set_client_codecs(ws, codecs)
+                # Snapshot y replay al momento del hello: cubren todo lo que
+                # pasó antes de suscribirse; lo posterior llega en vivo
+                conn.joined_seq = _seq
+                resume = "resume" in msg
+                replay = resume and can_replay(conn, msg.get("hub"), msg.get("resume"))
+                if resume:
+                    stats.reconnects += 1
+                # Se perdió demasiado: snapshot compacto en vez del historial
+                send_full_state(ws, resync=resume and not replay)
+                if replay:
+                    replay_to(conn, msg["resume"])
+                conn.ready()
+                continue
+
+            mouse_moved = apply_state_update(msg)
+            if msg.get("type") == "mouse":
+                # Heartbeat con el mismo valor: nada nuevo que repartir
+                if mouse_moved:
+                    mark_mouse_dirty()
+                continue
+            await relay(raw, msg, conn)
 
     except Exception:
         print("🔥 EXCEPCIÓN en handle_ws:")
         traceback.print_exc()
     finally:
-        clients.discard(ws)
+        conn.close()
+        if ws in client_codecs:
+            await set_client_codecs(ws, None)
+
+async def metrics_http(reader, writer):
+    """GET /metrics -> texto Prometheus. Sin dependencias: HTTP/1.0 a mano."""
+    try:
+        request = await reader.readline()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            body = stats.to_prometheus(list(clients.values())).encode("utf-8")
+            head = "HTTP/1.0 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+        else:
+            body = b"not found\n"
+            head = "HTTP/1.0 404 Not Found\r\nContent-Type: text/plain\r\n"
+        writer.write(f"{head}Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+    except Exception:
+        pass
+    finally:
+        writer.close()
 
 async def console_loop():
     print(f"WS Hub listo en ws://{HOST}:{PORT}")
@@ -118,9 +548,8 @@ async def console_loop():
             if len(parts) == 3:
                 try:
                     x = float(parts[1]); y = float(parts[2])
-                    msg = {"type": "mouse", "x": x, "y": y}
-                    apply_state_update(msg)
-                    await broadcast(msg)
+                    apply_state_update({"type": "mouse", "x": x, "y": y})
+                    mark_mouse_dirty()
                 except ValueError:
                     pass
             continue
@@ -133,11 +562,14 @@ async def main():
             handle_ws,
             HOST,
             PORT,
-            max_size=2**23,     # ~8MB para TTS WAV base64
+            max_size=2**23,     # ~8MB para TTS (WAV binario o base64 legado)
             ping_interval=20,
             ping_timeout=20,
             close_timeout=5,
         ):
+            if METRICS_HTTP_PORT:
+                await asyncio.start_server(metrics_http, HOST, METRICS_HTTP_PORT)
+                print(f"📈 Métricas en http://{HOST}:{METRICS_HTTP_PORT}/metrics")
             await console_loop()
     except Exception:
         print("🔥 EXCEPCIÓN arrancando el servidor:")
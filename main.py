@@ -1,7 +1,14 @@
-from ai.deepseek import ask_deepseek
+import base64
+import uuid
+
+from ai.deepseek import ask_deepseek, ask_deepseek_stream, get_client
+from config import STREAM_RESPONSES
 from core.memory import add_message, get_conversation
-from core.parser import parse_response
+from core.parser import parse_response, IncrementalResponseParser
+from core.intents import IntentRouter
+from core.pipeline import TurnPipeline
 from actions.dispatcher import dispatch_action
+from actions.open_app import ALLOWED_APPS
 
 from jarvis_avatar_web.server.avatar_ws_client import AvatarWSClient
 
@@ -12,6 +19,25 @@ AZURE_KEY = "4If2jiaeaalPiqhcpiLUnMHERnfnIzaB83nbFL5vBzoicNgZHKYrJQQJ99CAACYeBjF
 AZURE_REGION = "eastus"
 AZURE_VOICE = "es-MX-DaliaNeural"
 
+# ===============================
+# Pipeline del turno (timeouts por etapa, en segundos)
+# ===============================
+TTS_TIMEOUT = 15.0
+ACTION_TIMEOUT = 5.0
+
+# TTS por frases: el avatar empieza a hablar tras la primera frase
+TTS_CHUNKED = True
+TTS_MAX_PARALLEL = 2
+
+# Cache en disco de frases repetidas (python -m core.tts_cache seed ... para pre-cargar)
+TTS_CACHE = True
+
+# Audio al avatar como frame binario (header JSON + WAV crudo) en vez de base64
+AVATAR_BINARY_AUDIO = True
+
+# Formato de audio: el primero que TODOS los avatares conectados anuncian (hello -> hub)
+AUDIO_FORMAT_PREFERENCE = ["opus", "mp3", "wav"]
+
 SYSTEM_PROMPT = """
 Eres JARVIS, un asistente virtual que controla una computadora con Windows.
 
@@ -23,10 +49,10 @@ IMPORTANTE:
 
 RESPONDE SIEMPRE en JSON válido, sin texto adicional.
 
-Formato obligatorio:
+Formato obligatorio (en este orden):
 {
-  "speech": "Texto breve que dirás al usuario",
   "emotion": "neutral | happy | sad | relaxed | surprised | angry | sarcastic | thinking | confident | tired | smug | annoyed | scared",
+  "speech": "Texto breve que dirás al usuario",
   "action": {
     "type": "none | open_app | open_url | youtube_control | play_spotify",
     "data": {}
@@ -77,9 +103,200 @@ def normalize_emotion(e: str) -> str:
 def have_azure_config() -> bool:
     return bool((AZURE_KEY or "").strip()) and bool((AZURE_REGION or "").strip())
 
+def send_tts(payload: dict, audio: bytes):
+    if AVATAR_BINARY_AUDIO:
+        avatar.send_raw(payload, binary=audio)
+    else:
+        payload["audio_b64"] = base64.b64encode(audio).decode("utf-8")
+        avatar.send_raw(payload)
+
+def pick_audio_profile() -> str:
+    codecs = avatar.codecs
+    for profile in AUDIO_FORMAT_PREFERENCE:
+        if profile in codecs:
+            return profile
+    return "wav"
+
+def speak_reply(speech: str, emo: str):
+    """TTS (Azure) -> WS type:"tts"; si falla o no hay config -> say."""
+    if speech and have_azure_config():
+        sent_chunks = 0
+        try:
+            # Import LAZY para que NO truene el programa si falta el SDK / estás en otro Python.
+            from core.azure_tts import (
+                synthesize_audio, synthesize_chunked, split_speech, cache_stats
+            )
+
+            profile = pick_audio_profile()
+
+            if TTS_CHUNKED and len(split_speech(speech)) > 1:
+                utterance = uuid.uuid4().hex[:12]
+                for part in synthesize_chunked(
+                    speech,
+                    key=AZURE_KEY,
+                    region=AZURE_REGION,
+                    voice=AZURE_VOICE,
+                    max_parallel=TTS_MAX_PARALLEL,
+                    profile=profile
+                ):
+                    audio = part.pop("audio")
+                    timing = part.pop("timing", None)
+                    payload = {"type": "tts", "format": profile, "utterance": utterance}
+                    if part["chunk"] == 0:
+                        payload["emotion"] = emo
+                    payload.update(part)
+                    send_tts(payload, audio)
+                    sent_chunks += 1
+                    print(f"[WS OUT] tts chunk {part['chunk']} {profile} offset={part['offset_ms']}ms bytes={len(audio)}")
+                    print(f"[AZURE] timing chunk {part['chunk']}", timing)
+                return
+
+            tts_meta = {}
+            audio, visemes, _duration = synthesize_audio(
+                speech,
+                key=AZURE_KEY,
+                region=AZURE_REGION,
+                voice=AZURE_VOICE,
+                profile=profile,
+                meta=tts_meta
+            )
+
+            if not audio:
+                raise RuntimeError("Azure devolvió audio vacío.")
+
+            print(f"[AZURE] OK {profile} bytes={len(audio)} visemes={len(visemes)}")
+            print("[AZURE] timing", tts_meta.get("timing"))
+            if cache_stats() is not None:
+                print("[TTS CACHE]", cache_stats())
+
+            # Requiere que AvatarWSClient tenga send_raw()
+            if not hasattr(avatar, "send_raw"):
+                raise RuntimeError("AvatarWSClient no tiene send_raw(). Agrega send_raw() en avatar_ws_client.py")
+
+            send_tts({
+                "type": "tts",
+                "format": profile,
+                "emotion": emo,
+                "visemes": visemes
+            }, audio)
+            print("[WS OUT] tts queued, bytes=", len(audio))
+            print("[WS STATUS]", avatar.status())
+
+        except Exception as e:
+            if sent_chunks:
+                # Ya se escuchó parte de la respuesta: no la repetimos como say
+                print("[AZURE] FAIL a mitad de la respuesta:", repr(e))
+                return
+            print("[AZURE] FAIL -> fallback say:", repr(e))
+            avatar.send_say(speech, emo)
+    else:
+        # Sin texto o sin config Azure
+        if not speech:
+            print("[TTS] speech vacío -> no mando TTS.")
+        elif not have_azure_config():
+            print("[TTS] falta AZURE_KEY/AZURE_REGION -> fallback say.")
+        avatar.send_say(speech, emo)
+
+def warm_tts():
+    """
+    Importa el SDK y abre las conexiones con Azure para el perfil de audio que
+    usaría el próximo turno (según los codecs que el avatar anunció hasta ahora).
+    """
+    try:
+        from core.azure_tts import get_manager, enable_cache, cache_stats
+        if TTS_CACHE and cache_stats() is None:
+            from core.tts_cache import TTSCache
+            enable_cache(TTSCache())
+        profile = pick_audio_profile()
+        get_manager(AZURE_KEY, AZURE_REGION).warm_up(AZURE_VOICE, profile=profile)
+        print(f"[AZURE] synthesizers listos ({profile})")
+    except Exception as e:
+        print("[AZURE] warm-up falló:", repr(e))
+
+def on_avatar_codecs(codecs):
+    # Cambió lo que el avatar decodifica: calentar el perfil que se va a usar ahora
+    print("[WS] codecs del avatar:", codecs)
+    pipeline.submit("tts", warm_tts, timeout=TTS_TIMEOUT)
+
+def speak_async(speech: str, emo: str):
+    """TTS en la lane "tts": no bloquea el stream, la acción ni el siguiente prompt."""
+    pipeline.submit("tts", speak_reply, speech, emo, timeout=TTS_TIMEOUT)
+
+def dispatch_async(action: dict):
+    def on_done(result, error):
+        if error is not None:
+            print("⚠️ Error ejecutando acción:", error)
+        else:
+            print("✔", result)
+
+    pipeline.submit("action", dispatch_action, action, timeout=ACTION_TIMEOUT, on_done=on_done)
+
+def stream_reply(messages) -> dict:
+    """
+    Consume la respuesta en streaming: manda la emoción y arranca el TTS
+    en cuanto "emotion" y "speech" están completos, sin esperar a "action".
+    """
+    parser = IncrementalResponseParser()
+    emo = None
+    speech = None
+    spoken = False
+
+    for delta in ask_deepseek_stream(messages):
+        for key, value in parser.feed(delta):
+            if key == "emotion":
+                emo = normalize_emotion(value)
+                avatar.send_emotion(emo)
+            elif key == "speech":
+                speech = (value or "").strip() if isinstance(value, str) else ""
+
+            if not spoken and emo is not None and speech is not None:
+                print(f"Jarvis ({emo}): {speech}")
+                speak_async(speech, emo)
+                spoken = True
+
+    data = parser.finish()
+
+    if not spoken:
+        emo = normalize_emotion(data.get("emotion", "neutral"))
+        speech = (data.get("speech", "") or "").strip()
+        print(f"Jarvis ({emo}): {speech}")
+        avatar.send_emotion(emo)
+        speak_async(speech, emo)
+
+    return data
+
+def present_reply(data: dict):
+    """Respuesta ya completa (no streaming): memoria, consola, mood y TTS."""
+    emo = normalize_emotion(data.get("emotion", "neutral"))
+    speech = (data.get("speech", "") or "").strip()
+
+    add_message("assistant", speech)
+    print(f"Jarvis ({emo}): {speech}")
+
+    # 1) mood persistente
+    avatar.send_emotion(emo)
+
+    # 2) TTS (Azure) -> WS type:"tts"
+    speak_async(speech, emo)
+
+# Atajo local: comandos comunes sin ir al LLM
+router = IntentRouter(SYSTEM_PROMPT, ALLOWED_APPS)
+
 avatar = AvatarWSClient("ws://127.0.0.1:8765")
 avatar.start()
 
+# TTS y acciones corren en paralelo, fuera del REPL
+pipeline = TurnPipeline()
+pipeline.start()
+
+# En la lane "tts": el primer TTS espera al warm-up en vez de competir con él
+if have_azure_config():
+    avatar.on_codecs = on_avatar_codecs
+    pipeline.submit("tts", warm_tts, timeout=TTS_TIMEOUT)
+
+# Abre la conexión TLS a DeepSeek en background (el primer turno ya la reutiliza)
+get_client().warm_up()
+
 print("Jarvis iniciado. Escribe 'salir' para terminar.")
 
 try:
@@ -93,75 +310,48 @@ try:
         messages = [{"role": "system", "content": SYSTEM_PROMPT}]
         messages.extend(get_conversation())
 
-        try:
-            raw_response = ask_deepseek(messages)
-        except Exception as e:
-            print("⚠️ Error comunicándose con la IA:", e)
-            continue
-
-        try:
-            data = parse_response(raw_response)
-        except ValueError as e:
-            print("⚠️ Error parseando JSON:", e)
-            continue
-
-        emo = normalize_emotion(data.get("emotion", "neutral"))
-        speech = (data.get("speech", "") or "").strip()
-
-        add_message("assistant", speech)
-        print(f"Jarvis ({emo}): {speech}")
+        local = router.route(user_input)
+        if local is not None:
+            data = local
+            present_reply(data)
+            print("[INTENT] local", router.stats())
 
-        # 1) mood persistente
-        avatar.send_emotion(emo)
-
-        # 2) TTS (Azure) -> WS type:"tts"
-        #    Import LAZY para que NO truene el programa si falta el SDK / estás en otro Python.
-        if speech and have_azure_config():
+        elif STREAM_RESPONSES:
             try:
-                from core.azure_tts import synthesize_tts_with_visemes
-
-                audio_b64, visemes = synthesize_tts_with_visemes(
-                    speech,
-                    key=AZURE_KEY,
-                    region=AZURE_REGION,
-                    voice=AZURE_VOICE
-                )
-
-                if not audio_b64:
-                    raise RuntimeError("Azure devolvió audio vacío (audio_b64='').")
-
-                print(f"[AZURE] OK audio_b64_len={len(audio_b64)} visemes={len(visemes)}")
-
-                # Requiere que AvatarWSClient tenga send_raw()
-                if not hasattr(avatar, "send_raw"):
-                    raise RuntimeError("AvatarWSClient no tiene send_raw(). Agrega send_raw() en avatar_ws_client.py")
-
-                avatar.send_raw({
-                    "type": "tts",
-                    "emotion": emo,
-                    "audio_b64": audio_b64,
-                    "visemes": visemes
-                })
-                print("[WS OUT] tts queued, bytes=", len(audio_b64))
-                print("[WS STATUS]", avatar.status())
-
+                data = stream_reply(messages)
+            except ValueError as e:
+                print("⚠️ Error parseando JSON:", e)
+                continue
             except Exception as e:
-                print("[AZURE] FAIL -> fallback say:", repr(e))
-                avatar.send_say(speech, emo)
+                print("⚠️ Error comunicándose con la IA:", e)
+                continue
+
+            speech = (data.get("speech", "") or "").strip()
+            add_message("assistant", speech)
+            print("[LLM]", get_client().last_stats)
         else:
-            # Sin texto o sin config Azure
-            if not speech:
-                print("[TTS] speech vacío -> no mando TTS.")
-            elif not have_azure_config():
-                print("[TTS] falta AZURE_KEY/AZURE_REGION -> fallback say.")
-            avatar.send_say(speech, emo)
+            try:
+                raw_response = ask_deepseek(messages)
+            except Exception as e:
+                print("⚠️ Error comunicándose con la IA:", e)
+                continue
 
-        # 3) acción windows
-        try:
-            result = dispatch_action(data["action"])
-            print("✔", result)
-        except Exception as e:
-            print("⚠️ Error ejecutando acción:", e)
+            try:
+                data = parse_response(raw_response)
+            except ValueError as e:
+                print("⚠️ Error parseando JSON:", e)
+                continue
+
+            present_reply(data)
+            print("[LLM]", get_client().last_stats)
+
+        # 3) acción windows (en paralelo con el TTS)
+        action = data.get("action")
+        if isinstance(action, dict):
+            dispatch_async(action)
+        else:
+            print("⚠️ Error ejecutando acción: respuesta sin 'action'")
 
 finally:
+    pipeline.stop()
     avatar.stop()
@@ -0,0 +1,47 @@
+import json
+import struct
+
+# Framing http_bridge -> native_host: el mismo que Native Messaging,
+#   u32 little-endian = largo | JSON utf-8
+# así el host puede pasar cada frame a Chrome tal cual, y varios comandos
+# seguidos en el socket (pipelining) no se pegan entre sí.
+_LEN = struct.Struct("<I")
+MAX_FRAME_BYTES = 1024 * 1024     # Chrome no acepta más de 1 MB del host
+
+
+def encode_frame(obj: dict) -> bytes:
+    data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+    if len(data) > MAX_FRAME_BYTES:
+        raise ValueError("mensaje demasiado grande para Native Messaging")
+    return _LEN.pack(len(data)) + data
+
+
+def pack_frames(payloads) -> bytes:
+    """Varios JSON ya codificados -> un solo bloque header+JSON por cada uno."""
+    return b"".join(_LEN.pack(len(p)) + p for p in payloads)
+
+
+class FrameReader:
+    """Decodificador incremental: feed(bytes) -> [payload JSON completo, ...]."""
+
+    def __init__(self, max_frame: int = MAX_FRAME_BYTES):
+        self.max_frame = max_frame
+        self._buf = bytearray()
+
+    def feed(self, data: bytes) -> list:
+        self._buf += data
+        out = []
+        pos = 0
+        buf = self._buf
+        while len(buf) - pos >= _LEN.size:
+            (n,) = _LEN.unpack_from(buf, pos)
+            if n > self.max_frame:
+                raise ValueError(f"frame de {n} bytes (máx {self.max_frame})")
+            end = pos + _LEN.size + n
+            if end > len(buf):
+                break
+            out.append(bytes(buf[pos + _LEN.size:end]))
+            pos = end
+        if pos:
+            del buf[:pos]
+        return out
@@ -1,7 +1,11 @@
 import json
+import os
 import socket
+import socketserver
 import threading
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bridge_framing import MAX_FRAME_BYTES, encode_frame
 
 HTTP_HOST = "127.0.0.1"
 HTTP_PORT = 8766
@@ -9,8 +13,19 @@ HTTP_PORT = 8766
 TCP_HOST = "127.0.0.1"
 TCP_PORT = 8767
 
+# Transporte local opcional: el mismo HTTP por Unix socket (sin TCP).
+# Solo si el SO tiene AF_UNIX; actions/youtube_ext usa la misma ruta.
+HTTP_UDS_PATH = None      # p.ej. "/tmp/jarvis_bridge.sock"
+
+# Si el native host no lee, sendall no se queda colgado para siempre
+SEND_TIMEOUT_SEC = 1.0
+
+# Cuerpo más grande que esto ni se lee: se responde 413 y se cierra la conexión
+MAX_BODY_BYTES = 4 * MAX_FRAME_BYTES
+
 _native_conn = None
 _lock = threading.Lock()
+_send_lock = threading.Lock()   # un frame entero por vez en el socket del host
 
 def tcp_accept_loop():
     """Acepta conexión del native_host (Chrome-launched) por TCP."""
@@ -24,6 +39,7 @@ def tcp_accept_loop():
     while True:
         conn, _addr = server.accept()
         conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn.settimeout(SEND_TIMEOUT_SEC)
         with _lock:
             try:
                 if _native_conn:
@@ -33,6 +49,10 @@ def tcp_accept_loop():
             _native_conn = conn
 
 class Handler(BaseHTTPRequestHandler):
+    # Keep-alive: el cliente reusa la conexión entre comandos
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
     def _send_json(self, code: int, obj: dict):
         body = json.dumps(obj).encode("utf-8")
         self.send_response(code)
@@ -44,17 +64,34 @@ class Handler(BaseHTTPRequestHandler):
     def do_POST(self):
         global _native_conn
         try:
+            # Keep-alive: el cuerpo se consume antes de cualquier respuesta, o
+            # sus bytes se leerían como el siguiente request. Si no se puede
+            # (largo inválido o enorme), se cierra la conexión tras responder.
+            try:
+                length = int(self.headers.get("Content-Length", "0"))
+            except ValueError:
+                length = -1
+            if length < 0 or length > MAX_BODY_BYTES:
+                self.close_connection = True
+                code = 400 if length < 0 else 413
+                return self._send_json(code, {"ok": False, "error": "Content-Length invalido o demasiado grande"})
+            raw = self.rfile.read(length).decode("utf-8", errors="replace")
+
             if self.path != "/command":
                 return self._send_json(404, {"ok": False, "error": "Not found"})
 
-            length = int(self.headers.get("Content-Length", "0"))
-            raw = self.rfile.read(length).decode("utf-8", errors="replace")
-
             try:
                 payload = json.loads(raw)
             except Exception:
                 return self._send_json(400, {"ok": False, "error": "JSON invalido"})
 
+            # Un comando demasiado grande es culpa del request, no del host:
+            # se rechaza sin tocar la conexión con el native host
+            try:
+                frame = encode_frame(payload)
+            except ValueError as e:
+                return self._send_json(413, {"ok": False, "error": str(e)})
+
             with _lock:
                 conn = _native_conn
 
@@ -62,7 +99,8 @@ class Handler(BaseHTTPRequestHandler):
                 return self._send_json(503, {"ok": False, "error": "Chrome/Native host no conectado (abre Chrome con la extension)"})
 
             try:
-                conn.sendall(json.dumps(payload).encode("utf-8"))
+                with _send_lock:
+                    conn.sendall(frame)
             except Exception as e:
                 # limpiar conexión muerta
                 with _lock:
@@ -78,7 +116,8 @@ class Handler(BaseHTTPRequestHandler):
             return self._send_json(200, {"ok": True})
 
         except Exception as e:
-            # NUNCA te cierres sin responder
+            # NUNCA te cierres sin responder (y no reusar: el cuerpo pudo quedar a medias)
+            self.close_connection = True
             try:
                 return self._send_json(500, {"ok": False, "error": f"Crash http_bridge: {e}"})
             except Exception:
@@ -88,10 +127,28 @@ class Handler(BaseHTTPRequestHandler):
     def log_message(self, format, *args):
         return
 
+class UnixHandler(Handler):
+    disable_nagle_algorithm = False     # no es TCP
+
+    def address_string(self):
+        return "unix"
+
+def serve_unix(path: str):
+    # socketserver.UnixStreamServer solo existe donde hay AF_UNIX
+    class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    if os.path.exists(path):
+        os.unlink(path)
+    UnixHTTPServer(path, UnixHandler).serve_forever()
+
 def main():
     t = threading.Thread(target=tcp_accept_loop, daemon=True)
     t.start()
-    httpd = HTTPServer((HTTP_HOST, HTTP_PORT), Handler)
+    if HTTP_UDS_PATH and hasattr(socket, "AF_UNIX"):
+        threading.Thread(target=serve_unix, args=(HTTP_UDS_PATH,), daemon=True).start()
+    # Un hilo por conexión: un comando lento no frena a los demás
+    httpd = ThreadingHTTPServer((HTTP_HOST, HTTP_PORT), Handler)
     httpd.serve_forever()
 
 if __name__ == "__main__":
@@ -1,15 +1,20 @@
 import json
+import selectors
 import socket
 import struct
 import sys
 import threading
 import time
 
+from bridge_framing import FrameReader, pack_frames
+
 LOCK_PORT = 8768          # impedir múltiples instancias
 BRIDGE_HOST = "127.0.0.1"
-BRIDGE_PORT = 8767        # (para futuro http_bridge)
+BRIDGE_PORT = 8767        # http_bridge
 
 PING_TIMEOUT_SEC = 6      # si no hay ping en 6s, cerramos
+RECONNECT_SEC = 0.25      # reintento de conexión al bridge
+SELECT_TIMEOUT_SEC = 0.5  # cada cuánto se mira stop_event sin tráfico
 
 def send_native_message(obj: dict) -> None:
     data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
@@ -17,6 +22,12 @@ def send_native_message(obj: dict) -> None:
     sys.stdout.buffer.write(data)
     sys.stdout.buffer.flush()
 
+def write_native_frames(payloads: list, out=None) -> None:
+    """Varios JSON (bytes) a Chrome en una sola escritura + flush."""
+    out = out or sys.stdout.buffer
+    out.write(pack_frames(payloads))
+    out.flush()
+
 def acquire_single_instance_lock() -> socket.socket:
     lock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     lock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
@@ -84,6 +95,76 @@ def chrome_reader(stop_event: threading.Event, last_ping_ref: list[float]) -> No
     finally:
         stop_event.set()
 
+def _valid_json(payload: bytes) -> bool:
+    # Chrome corta el host si le llega algo que no es JSON
+    try:
+        json.loads(payload)
+        return True
+    except Exception:
+        return False
+
+def bridge_loop(stop_event: threading.Event, out=None, connect=try_connect_bridge) -> None:
+    """
+    Reenvía a Chrome los comandos del bridge apenas llegan (selectors, sin
+    sleep). El socket trae frames header+JSON; un recv puede traer varios
+    (pipelining) o medio, FrameReader los separa.
+    """
+    sel = selectors.DefaultSelector()
+    sock = None
+    reader = None
+
+    def drop():
+        nonlocal sock
+        if sock is not None:
+            try:
+                sel.unregister(sock)
+            except Exception:
+                pass
+            try:
+                sock.close()
+            except Exception:
+                pass
+        sock = None
+
+    try:
+        while not stop_event.is_set():
+            if sock is None:
+                sock = connect()
+                if sock is None:
+                    stop_event.wait(RECONNECT_SEC)
+                    continue
+                sock.setblocking(False)
+                sel.register(sock, selectors.EVENT_READ)
+                reader = FrameReader()
+
+            if not sel.select(timeout=SELECT_TIMEOUT_SEC):
+                continue
+            try:
+                data = sock.recv(65536)
+            except BlockingIOError:
+                continue
+            except OSError:
+                data = b""
+            if not data:
+                drop()
+                continue
+
+            try:
+                frames = reader.feed(data)
+            except ValueError:
+                drop()      # framing roto: mejor reconectar limpio
+                continue
+
+            frames = [f for f in frames if _valid_json(f)]
+            if frames:
+                try:
+                    write_native_frames(frames, out)
+                except Exception:
+                    stop_event.set()    # Chrome ya no lee stdout
+    finally:
+        drop()
+        sel.close()
+
 def main() -> None:
     # 1) Evitar duplicados
     try:
@@ -108,37 +189,10 @@ def main() -> None:
     except Exception:
         sys.exit(0)
 
-    bridge_sock = None
-
+    # 5) Comandos del bridge -> extensión
     try:
-        while not stop_event.is_set():
-            # (Opcional/futuro) Conectar al bridge y reenviar comandos a la extensión
-            if bridge_sock is None:
-                bridge_sock = try_connect_bridge()
-
-            if bridge_sock is not None:
-                try:
-                    raw = bridge_sock.recv(65536)
-                    if not raw:
-                        bridge_sock.close()
-                        bridge_sock = None
-                    else:
-                        payload = json.loads(raw.decode("utf-8", errors="replace"))
-                        send_native_message(payload)
-                except Exception:
-                    try:
-                        bridge_sock.close()
-                    except Exception:
-                        pass
-                    bridge_sock = None
-
-            time.sleep(0.05)
+        bridge_loop(stop_event)
     finally:
-        try:
-            if bridge_sock is not None:
-                bridge_sock.close()
-        except Exception:
-            pass
         try:
             lock_sock.close()
         except Exception:
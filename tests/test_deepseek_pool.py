@@ -0,0 +1,144 @@
+"""
+DeepSeekClient contra un stand-in local de /chat/completions: cuenta las
+conexiones del lado del server para comprobar que ask() y ask_stream()
+reutilizan el socket y que last_stats["reused"] dice la verdad.
+
+Uso:  python -m pytest tests/test_deepseek_pool.py
+"""
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.deepseek import DeepSeekClient
+
+REPLY = json.dumps({"choices": [{"message": {"content": "hola"}}]}).encode("utf-8")
+SSE_EVENTS = [
+    {"choices": [{"delta": {"content": "ho"}}]},
+    {"choices": [{"delta": {"content": "la"}}]},
+]
+MESSAGES = [{"role": "user", "content": "hola"}]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+    close_each = False              # True: "Connection: close" en cada respuesta
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0"))))
+        if body.get("stream"):
+            self._send_sse()
+        else:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(REPLY)))
+            self._end_headers()
+            self.wfile.write(REPLY)
+
+    def do_HEAD(self):
+        self.send_response(405)
+        self.send_header("Content-Length", "0")
+        self._end_headers()
+
+    def _send_sse(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self._end_headers()
+        events = [f"data: {json.dumps(e)}\n\n" for e in SSE_EVENTS] + ["data: [DONE]\n\n"]
+        for event in events:
+            data = event.encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _end_headers(self):
+        if self.close_each:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        return
+
+
+class CloseHandler(Handler):
+    close_each = True
+
+
+def start_server(handler):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    httpd.daemon_threads = True
+    httpd.lock = threading.Lock()
+    httpd.connections = 0
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+@pytest.fixture
+def server():
+    httpd = start_server(Handler)
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def client_for(httpd) -> DeepSeekClient:
+    return DeepSeekClient(f"http://127.0.0.1:{httpd.server_address[1]}/chat/completions")
+
+
+def test_ask_reuses_one_connection(server):
+    client = client_for(server)
+    for _ in range(4):
+        assert client.ask(MESSAGES) == "hola"
+    client.close()
+
+    assert server.connections == 1
+    assert client.totals == {"requests": 4, "reused": 3, "new_connections": 1}
+
+
+def test_ask_stream_reuses_one_connection(server):
+    client = client_for(server)
+    reused = []
+    for _ in range(4):
+        assert "".join(client.ask_stream(MESSAGES)) == "hola"
+        reused.append(client.last_stats["reused"])
+    client.close()
+
+    assert server.connections == 1
+    assert reused == [False, True, True, True]
+
+
+def test_warm_up_connection_is_reused(server):
+    client = client_for(server)
+    client.warm_up(background=False)
+    client.ask(MESSAGES)
+    client.close()
+
+    assert server.connections == 1
+    assert client.last_stats["reused"] is True
+
+
+def test_reconnect_is_reported_as_new():
+    httpd = start_server(CloseHandler)
+    try:
+        client = client_for(httpd)
+        for _ in range(3):
+            "".join(client.ask_stream(MESSAGES))
+            assert client.last_stats["reused"] is False
+        client.close()
+
+        assert httpd.connections == 3
+        assert client.totals["new_connections"] == 3
+    finally:
+        httpd.shutdown()
+        httpd.server_close()